@@ -103,6 +103,7 @@ export default function App() {
         let bufferedToolEvents: ToolEvent[] = [];
         let bufferedImages: Record<string, string> = {};
         let pendingReasoning: string | null = null;
+        let pendingReasoningDelta = "";
         let pendingThreadId: string | null = null;
         let pendingError: string | null = null;
         let pendingSafety: SafetyResult | null = null;
@@ -110,8 +111,13 @@ export default function App() {
 
         const flushBufferedUpdates = () => {
           if (pendingReasoning !== null) {
-            setReasoning(pendingReasoning);
+            setReasoning(pendingReasoning + pendingReasoningDelta);
             pendingReasoning = null;
+            pendingReasoningDelta = "";
+          } else if (pendingReasoningDelta) {
+            const delta = pendingReasoningDelta;
+            pendingReasoningDelta = "";
+            setReasoning((prev) => prev + delta);
           }
 
           if (bufferedToolEvents.length > 0) {
@@ -166,9 +172,13 @@ export default function App() {
           },
           controller.signal,
         )) {
-          // Reasoning — REPLACE mode (backend sends cumulative)
+          // Reasoning — REPLACE (full text) resets, APPEND adds a delta
           if (chunk.reasoning !== null) {
             pendingReasoning = chunk.reasoning;
+            pendingReasoningDelta = "";
+          }
+          if (chunk.reasoningDelta) {
+            pendingReasoningDelta += chunk.reasoningDelta;
           }
 
           // Tool events — append
@@ -43,6 +43,18 @@ describe("parseChunk", () => {
     expect(result.text).toBe("");
   });
 
+  it("extracts batched tool events from one marker", () => {
+    const events = [
+      { type: "tool_event", tool: "web_search", status: "started", timestamp: "2025-01-01T00:00:00Z" },
+      { type: "tool_event", tool: "web_search", status: "completed", timestamp: "2025-01-01T00:00:00Z" },
+    ];
+    const raw = `__TOOL_EVENT__${JSON.stringify(events)}__END_TOOL_EVENT__`;
+    const result = parseChunk(raw);
+    expect(result.toolEvents).toHaveLength(2);
+    expect(result.toolEvents[1].status).toBe("completed");
+    expect(result.text).toBe("");
+  });
+
   it("extracts reasoning from markers", () => {
     const raw =
       "__REASONING_REPLACE__Step 1: Analyze the topic\nStep 2: Research trends__END_REASONING_REPLACE__";
@@ -61,6 +73,25 @@ describe("parseChunk", () => {
     expect(result.reasoning).toBe("Thinking about the topic...");
   });
 
+  it("parses reasoning_delta JSON envelope as an append", () => {
+    const raw = JSON.stringify({
+      type: "reasoning_delta",
+      reasoning: " more thoughts",
+    });
+    const result = parseChunk(raw);
+    expect(result.reasoningDelta).toBe(" more thoughts");
+    expect(result.reasoning).toBeNull();
+  });
+
+  it("extracts reasoning deltas from append markers", () => {
+    const raw =
+      "__REASONING_APPEND__Step 1__END_REASONING_APPEND__" +
+      "__REASONING_APPEND__, Step 2__END_REASONING_APPEND__";
+    const result = parseChunk(raw);
+    expect(result.reasoningDelta).toBe("Step 1, Step 2");
+    expect(result.text).toBe("");
+  });
+
   it("extracts content from choices", () => {
     const raw = JSON.stringify({
       choices: [
@@ -72,7 +72,7 @@ export interface ChatChunk {
     messages: Array<{ role: string; content: string }>;
   }>;
   thread_id?: string;
-  type?: "done" | "error" | "reasoning_update" | "safety" | "image";
+  type?: "done" | "error" | "reasoning_update" | "reasoning_delta" | "safety" | "image";
   reasoning?: string;
   error?: string;
   message?: string;
@@ -87,11 +87,15 @@ const TOOL_EVENT_RE =
   /__TOOL_EVENT__([\s\S]*?)__END_TOOL_EVENT__/g;
 const REASONING_RE =
   /__REASONING_REPLACE__([\s\S]*?)__END_REASONING_REPLACE__/g;
+const REASONING_APPEND_RE =
+  /__REASONING_APPEND__([\s\S]*?)__END_REASONING_APPEND__/g;
 
 export interface ParsedChunk {
   text: string;
   toolEvents: ToolEvent[];
   reasoning: string | null;
+  /** Reasoning text to append to what the client already shows. */
+  reasoningDelta: string | null;
   done: boolean;
   threadId: string | null;
   error: string | null;
@@ -105,12 +109,15 @@ export interface ParsedChunk {
 export function parseChunk(raw: string): ParsedChunk {
   const toolEvents: ToolEvent[] = [];
   let reasoning: string | null = null;
+  let reasoningDelta: string | null = null;
   let cleaned = raw;
 
-  // Extract tool events
+  // Extract tool events (an array when one update carried several)
   for (const m of raw.matchAll(TOOL_EVENT_RE)) {
     try {
-      toolEvents.push(JSON.parse(m[1]));
+      const parsed: ToolEvent | ToolEvent[] = JSON.parse(m[1]);
+      if (Array.isArray(parsed)) toolEvents.push(...parsed);
+      else toolEvents.push(parsed);
     } catch { /* skip malformed */ }
     cleaned = cleaned.replace(m[0], "");
   }
@@ -118,41 +125,51 @@ export function parseChunk(raw: string): ParsedChunk {
   // Extract reasoning (REPLACE mode — full cumulative text)
   for (const m of raw.matchAll(REASONING_RE)) {
     reasoning = m[1];
+    reasoningDelta = null;
+    cleaned = cleaned.replace(m[0], "");
+  }
+
+  // Extract reasoning (APPEND mode — new text only)
+  for (const m of raw.matchAll(REASONING_APPEND_RE)) {
+    reasoningDelta = (reasoningDelta ?? "") + m[1];
     cleaned = cleaned.replace(m[0], "");
   }
 
   // Try to parse remaining as JSON
   cleaned = cleaned.trim();
   if (!cleaned) {
-    return { text: "", toolEvents, reasoning, done: false, threadId: null, error: null, safety: null, imageData: null };
+    return { text: "", toolEvents, reasoning, reasoningDelta, done: false, threadId: null, error: null, safety: null, imageData: null };
   }
 
   try {
     const obj: ChatChunk = JSON.parse(cleaned);
     if (obj.type === "done") {
-      return { text: "", toolEvents, reasoning, done: true, threadId: obj.thread_id ?? null, error: null, safety: null, imageData: null };
+      return { text: "", toolEvents, reasoning, reasoningDelta, done: true, threadId: obj.thread_id ?? null, error: null, safety: null, imageData: null };
     }
     // Image data from generate_image tool
     if (obj.type === "image" && obj.platform && obj.image_base64) {
-      return { text: "", toolEvents, reasoning, done: false, threadId: null, error: null, safety: null, imageData: { platform: obj.platform, image_base64: obj.image_base64 } };
+      return { text: "", toolEvents, reasoning, reasoningDelta, done: false, threadId: null, error: null, safety: null, imageData: { platform: obj.platform, image_base64: obj.image_base64 } };
     }
     // Safety result from Content Safety analysis
     if (obj.type === "safety" && obj.safety) {
-      return { text: "", toolEvents, reasoning, done: false, threadId: null, error: null, safety: obj.safety as SafetyResult, imageData: null };
+      return { text: "", toolEvents, reasoning, reasoningDelta, done: false, threadId: null, error: null, safety: obj.safety as SafetyResult, imageData: null };
     }
     // Reasoning delivered as JSON envelope (avoids \n\n SSE framing issues)
     if (obj.type === "reasoning_update" && obj.reasoning) {
-      return { text: "", toolEvents, reasoning: obj.reasoning, done: false, threadId: null, error: null, safety: null, imageData: null };
+      return { text: "", toolEvents, reasoning: obj.reasoning, reasoningDelta: null, done: false, threadId: null, error: null, safety: null, imageData: null };
+    }
+    if (obj.type === "reasoning_delta" && obj.reasoning) {
+      return { text: "", toolEvents, reasoning, reasoningDelta: obj.reasoning, done: false, threadId: null, error: null, safety: null, imageData: null };
     }
     if (obj.error) {
-      return { text: "", toolEvents, reasoning, done: false, threadId: null, error: obj.error, safety: null, imageData: null };
+      return { text: "", toolEvents, reasoning, reasoningDelta, done: false, threadId: null, error: obj.error, safety: null, imageData: null };
     }
     const content = obj.choices?.[0]?.messages?.[0]?.content ?? "";
     const threadId = obj.thread_id ?? null;
-    return { text: content, toolEvents, reasoning, done: false, threadId, error: null, safety: null, imageData: null };
+    return { text: content, toolEvents, reasoning, reasoningDelta, done: false, threadId, error: null, safety: null, imageData: null };
   } catch {
     // Not JSON — treat as plain text
-    return { text: cleaned, toolEvents, reasoning, done: false, threadId: null, error: null, safety: null, imageData: null };
+    return { text: cleaned, toolEvents, reasoning, reasoningDelta, done: false, threadId: null, error: null, safety: null, imageData: null };
   }
 }
 
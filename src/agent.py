@@ -7,29 +7,29 @@ Uses AzureOpenAIResponsesClient from agent-framework-core.
 # pylint: disable=no-name-in-module
 
 import asyncio
-import json
+import contextlib
+import inspect
 import logging
+import re
 import time
-from collections.abc import AsyncIterator
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Any
 
-from agent_framework import AgentResponseUpdate
-from agent_framework.azure import AzureOpenAIResponsesClient  # type: ignore[attr-defined]
+import orjson
 from opentelemetry import trace
+from opentelemetry.context import Context
 
-from src import config
-from src.agentic_retrieval import is_configured as _iq_configured
-from src.agentic_retrieval import search_knowledge_base
-from src.client import get_client
+from src import config, response_cache
 from src.prompts import get_system_prompt
 from src.telemetry import get_tracer
-from src.tools import generate_content, generate_image, init_image_store, pop_pending_images, review_content
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamResult:
     """Accumulated results from agent streaming, including extracted images."""
 
@@ -42,54 +42,389 @@ TOOL_EVENT_START = "__TOOL_EVENT__"
 TOOL_EVENT_END = "__END_TOOL_EVENT__"
 REASONING_START = "__REASONING_REPLACE__"
 REASONING_END = "__END_REASONING_REPLACE__"
+REASONING_APPEND_START = "__REASONING_APPEND__"
+REASONING_APPEND_END = "__END_REASONING_APPEND__"
 IMAGE_DATA_START = "__IMAGE_DATA__"
 IMAGE_DATA_END = "__END_IMAGE_DATA__"
 
 # Reasoning throttle (only send updates every N ms to avoid flooding)
 REASONING_THROTTLE_MS = 100
+_REASONING_THROTTLE_NS = REASONING_THROTTLE_MS * 1_000_000
+# Chars kept from each end of the accumulated reasoning to recognise
+# cumulative SDK updates without comparing against the whole text
+_REASONING_SENTINEL_CHARS = 64
+
+# Mapping of hosted tool type substrings → canonical tool names
+_HOSTED_PATTERNS: dict[str, str] = {
+    "web_search_call": "web_search",
+    "web_search": "web_search",
+    "file_search_call": "file_search",
+    "file_search": "file_search",
+    "mcp_call": "mcp_search",
+    "mcp_list_tools": "mcp_search",
+}
+# Content.type values under which some SDK versions surface hosted tools
+_HOSTED_CT = frozenset({"web_search_call", "file_search_call", "mcp_call", "mcp_list_tools"})
+# Output item types match a key exactly; raw stream event types embed one
+# (e.g. "response.web_search_call.in_progress"), so fall back to a single
+# compiled alternation rather than one substring scan per pattern.
+_HOSTED_TYPE_RE = re.compile("|".join(re.escape(p) for p in sorted(_HOSTED_PATTERNS, key=len, reverse=True)))
+
+# Transient Azure service errors: prompt failures, throttling, 5xx, timeouts
+_RETRYABLE_RE = re.compile(
+    r"failed to complete the prompt|429|rate limit|too many requests|50[0234]"
+    r"|internal server error|service unavailable|timeout|timed out",
+    re.IGNORECASE,
+)
+
+# Bit flags for the per-stream ``tool_state`` map
+_TOOL_STARTED = 1  # start event emitted for this call/item id
+_TOOL_ENDED = 2  # completed event emitted for this call/item id
+_TOOL_DETECTED = 4  # hosted tool NAME seen during the stream
+
+# Previous messages included in the agent query for multi-turn context
+HISTORY_CONTEXT_MESSAGES = 6
+
+# Approximate per-post output budgets (tokens), in line with the platform
+# character limits in the system prompt; stated in the query so the model
+# does not pad posts beyond what the platform will show.
+_POST_TOKEN_BUDGET = {"linkedin": 750, "x": 80, "instagram": 550}
+_DEFAULT_POST_TOKEN_BUDGET = 300
 
 # Retry configuration for transient Azure API errors
 MAX_RETRIES = 2
 RETRY_BASE_DELAY_S = 2.0
 
+# Frames the agent may run ahead of a slow SSE client
+STREAM_BUFFER_FRAMES = 64
+_STREAM_DONE = object()
+
 
 def _is_retryable_error(exc: Exception) -> bool:
     """Check if an exception is a transient Azure API error worth retrying."""
-    msg = str(exc).lower()
-    # Azure service transient errors
-    if "failed to complete the prompt" in msg:
-        return True
-    if "429" in msg or "rate limit" in msg or "too many requests" in msg:
-        return True
-    if "500" in msg or "502" in msg or "503" in msg or "504" in msg:
-        return True
-    if "internal server error" in msg or "service unavailable" in msg:
-        return True
-    if "timeout" in msg or "timed out" in msg:
-        return True
-    return False
-
-
-def create_tool_event(tool_name: str, status: str, message: str | None = None) -> str:
+    return _RETRYABLE_RE.search(str(exc)) is not None
+
+
+def _match_hosted_tool(type_str: str) -> str | None:
+    """Map an output item or raw stream event type to a hosted tool name."""
+    tool_name = _HOSTED_PATTERNS.get(type_str)
+    if tool_name is None:
+        match = _HOSTED_TYPE_RE.search(type_str)
+        if match:
+            tool_name = _HOSTED_PATTERNS[match.group()]
+    return tool_name
+
+
+def create_tool_event(
+    tool_name: str,
+    status: str,
+    message: str | None = None,
+    timestamp: datetime | None = None,
+) -> str:
     """Create a JSON-formatted tool event for SSE streaming.
 
     Args:
         tool_name: Name of the tool (e.g., "generate_content").
         status: "started", "completed", or "error".
         message: Optional message for additional context.
+        timestamp: Event time; defaults to now. Lets a caller share one
+            timestamp across the events of a single stream update.
 
     Returns:
         String with tool event markers for frontend parsing.
     """
-    event = {
+    event: dict[str, Any] = {
         "type": "tool_event",
         "tool": tool_name,
         "status": status,
-        "timestamp": datetime.now(UTC).isoformat(),
+        "timestamp": timestamp or datetime.now(UTC),
     }
     if message:
         event["message"] = message
-    return f"{TOOL_EVENT_START}{json.dumps(event, ensure_ascii=False)}{TOOL_EVENT_END}"
+    return _tool_events_frame([event])
+
+
+def _tool_events_frame(events: list[dict[str, Any]]) -> str:
+    """Wrap tool events in TOOL_EVENT markers.
+
+    A single event is sent as a JSON object; several events from the same
+    stream update share one frame as a JSON array.
+    """
+    # orjson formats the datetime in C (ISO 8601, "Z" suffix) and always
+    # emits UTF-8, matching the previous ensure_ascii=False output.
+    payload = orjson.dumps(events[0] if len(events) == 1 else events, option=orjson.OPT_UTC_Z).decode()
+    return TOOL_EVENT_START + payload + TOOL_EVENT_END
+
+
+def _reasoning_append_frame(delta: str) -> str:
+    """Wrap new reasoning text in APPEND markers (client appends it)."""
+    return REASONING_APPEND_START + delta + REASONING_APPEND_END
+
+
+def _reasoning_frame(text: str) -> str:
+    """Wrap accumulated reasoning text in REPLACE markers.
+
+    Frames stay ``str``: they are re-parsed by ``api.generate()`` before
+    anything reaches the ASGI layer, so pre-encoding here would only add a
+    decode step downstream.
+    """
+    return REASONING_START + text + REASONING_END
+
+
+def _image_frame(platform: str, image_b64: str) -> str:
+    """Wrap a generated image payload in IMAGE_DATA markers."""
+    payload = orjson.dumps({"platform": platform, "image_base64": image_b64}).decode()
+    return IMAGE_DATA_START + payload + IMAGE_DATA_END
+
+
+@dataclass(slots=True)
+class StreamState:
+    """Mutable per-stream state shared by the Content handlers."""
+
+    tracer: trace.Tracer
+    ctx: Context
+    # False when the user turned the thinking display off (reasoning_summary="off")
+    emit_reasoning: bool = True
+    # Reasoning text (SDK sends deltas; we accumulate + REPLACE).  Deltas are
+    # kept as a list and joined only when a frame is actually sent —
+    # repeated ``str +=`` would copy the whole buffer per delta.
+    reasoning_parts: list[str] = field(default_factory=list)
+    reasoning_len: int = 0
+    reasoning_head: str = ""  # first _REASONING_SENTINEL_CHARS chars
+    reasoning_tail: str = ""  # last _REASONING_SENTINEL_CHARS chars
+    # Reasoning text not yet sent; flushed as one APPEND frame per throttle
+    # window so each character goes over the wire once.
+    pending_reasoning: list[str] = field(default_factory=list)
+    prev_reasoning_delta: str = ""
+    last_reasoning_send: int = 0  # monotonic ns
+    # Track tool calls already emitted to avoid duplicates (each streaming
+    # update re-sends the same function_call content).  One dict of bit
+    # flags: call/item ids carry _TOOL_STARTED/_TOOL_ENDED, hosted tool
+    # names carry _TOOL_DETECTED.
+    tool_state: dict[str, int] = field(default_factory=dict)
+    # Map call_id → tool_name (function_result may not carry the name)
+    call_id_to_name: dict[str, str] = field(default_factory=dict)
+    tool_spans: dict[str, trace.Span] = field(default_factory=dict)  # call_id → span
+    # Tool events of the current stream update, sent together as one frame
+    tool_events: list[dict[str, Any]] = field(default_factory=list)
+    # One timestamp per stream update, taken on its first tool event
+    update_ts: datetime | None = None
+
+    def should_send_reasoning(self) -> bool:
+        now = time.monotonic_ns()
+        if now - self.last_reasoning_send >= _REASONING_THROTTLE_NS:
+            self.last_reasoning_send = now
+            return True
+        return False
+
+    def tool_event(self, tool_name: str, status: str) -> None:
+        if self.update_ts is None:
+            self.update_ts = datetime.now(UTC)
+        self.tool_events.append(
+            {"type": "tool_event", "tool": tool_name, "status": status, "timestamp": self.update_ts}
+        )
+
+    def flush_tool_events(self) -> str | None:
+        """Return the queued tool events as one frame, or None if there are none."""
+        if not self.tool_events:
+            return None
+        frame = _tool_events_frame(self.tool_events)
+        self.tool_events = []
+        return frame
+
+    def flush_tool_events_into(self, frames: list[str]) -> None:
+        """Append queued tool events to frames, ahead of the frame that follows them."""
+        frame = self.flush_tool_events()
+        if frame:
+            frames.append(frame)
+
+    def detected(self, tool_name: str) -> bool:
+        return bool(self.tool_state.get(tool_name, 0) & _TOOL_DETECTED)
+
+    # ----- helpers for hosted tool event emission -----
+    def emit_start(self, tool_name: str, item_id: str) -> None:
+        state = self.tool_state.get(item_id, 0)
+        if not state & _TOOL_STARTED:
+            self.tool_state[item_id] = state | _TOOL_STARTED
+            self.call_id_to_name[item_id] = tool_name
+            self.tool_state[tool_name] = self.tool_state.get(tool_name, 0) | _TOOL_DETECTED
+            self.tool_event(tool_name, "started")
+
+    def emit_end(self, tool_name: str, item_id: str) -> None:
+        state = self.tool_state.get(item_id, 0)
+        if not state & _TOOL_ENDED:
+            # Ensure start was recorded first
+            if not state & _TOOL_STARTED:
+                self.call_id_to_name[item_id] = tool_name
+            self.tool_state[item_id] = state | _TOOL_STARTED | _TOOL_ENDED
+            self.tool_state[tool_name] = self.tool_state.get(tool_name, 0) | _TOOL_DETECTED
+            self.tool_event(tool_name, "completed")
+
+
+# ---------- Content handlers (dispatched on Content.type) ---------- #
+# The SDK's Content class always defines type/text/name/call_id/id/
+# annotations/raw_representation, so handlers read them directly.
+
+
+def _on_text_reasoning(content: Any, state: StreamState, frames: list[str]) -> None:
+    """GPT-5 reasoning token — accumulate and throttle."""
+    text = content.text
+    if not text or not state.emit_reasoning:
+        return
+    n = state.reasoning_len
+    tail = state.reasoning_tail
+    if n and len(text) >= n and text.startswith(state.reasoning_head) and text[n - len(tail) : n] == tail:
+        # SDK sent cumulative text — replace, and send only the new tail.
+        # Matching both ends of the accumulated text keeps this O(1).
+        if len(text) > n:
+            state.pending_reasoning.append(text[n:])
+        state.reasoning_parts = [text]
+        state.reasoning_len = len(text)
+        state.reasoning_head = text[:_REASONING_SENTINEL_CHARS]
+        state.reasoning_tail = text[-_REASONING_SENTINEL_CHARS:]
+    elif text != state.prev_reasoning_delta:
+        # True delta — append (an exact repeat of the previous delta is
+        # the SDK re-sending it and is ignored)
+        state.reasoning_parts.append(text)
+        state.reasoning_len += len(text)
+        state.pending_reasoning.append(text)
+        if len(state.reasoning_head) < _REASONING_SENTINEL_CHARS:
+            state.reasoning_head = (state.reasoning_head + text)[:_REASONING_SENTINEL_CHARS]
+        state.reasoning_tail = (tail + text)[-_REASONING_SENTINEL_CHARS:]
+    state.prev_reasoning_delta = text
+
+    if state.pending_reasoning and state.should_send_reasoning():
+        state.flush_tool_events_into(frames)
+        frames.append(_reasoning_append_frame("".join(state.pending_reasoning)))
+        state.pending_reasoning.clear()
+
+
+def _on_function_call(content: Any, state: StreamState, frames: list[str]) -> None:
+    """Tool being invoked — emit only once per call_id."""
+    call_id = content.call_id
+    # The SDK re-sends the same function_call on every update; once the
+    # start is emitted and the name is known there is nothing left to do.
+    if call_id in state.call_id_to_name and state.tool_state.get(call_id, 0) & _TOOL_STARTED:
+        return
+    tool_name = content.name or "unknown_tool"
+    call_id = call_id or tool_name
+    # Remember for later function_result lookup
+    if tool_name != "unknown_tool":
+        state.call_id_to_name[call_id] = tool_name
+    flags = state.tool_state.get(call_id, 0)
+    if not flags & _TOOL_STARTED:
+        state.tool_state[call_id] = flags | _TOOL_STARTED
+        # OTel: start tool span
+        state.tool_spans[call_id] = state.tracer.start_span(
+            f"tool.{tool_name}",
+            context=state.ctx,
+            attributes={"tool.name": tool_name},
+        )
+        state.tool_event(tool_name, "started")
+
+
+def _on_function_result(content: Any, state: StreamState, frames: list[str]) -> None:
+    """Tool returned result — emit only once per call_id.
+
+    Image data is captured via the ContextVar side-channel in tools.py, so
+    it is not extracted from function_result (which the SDK may truncate).
+    """
+    call_id = content.call_id
+    if not call_id:
+        return
+    flags = state.tool_state.get(call_id, 0)
+    if flags & _TOOL_ENDED:
+        return
+    state.tool_state[call_id] = flags | _TOOL_ENDED
+    # Resolve name from call_id map (function_result often lacks .name)
+    tool_name = content.name or state.call_id_to_name.get(call_id, "unknown_tool")
+    # OTel: end tool span
+    sp = state.tool_spans.pop(call_id, None)
+    if sp:
+        sp.end()
+    state.tool_event(tool_name, "completed")
+
+
+def _on_hosted_content(content: Any, state: StreamState, frames: list[str]) -> None:
+    """Hosted tool exposed as a Content item (some SDK versions)."""
+    tool_name = _HOSTED_PATTERNS.get(content.type, "unknown_tool")
+    item_id = content.id or content.call_id or tool_name
+    state.emit_start(tool_name, item_id)
+
+
+def _on_text(content: Any, state: StreamState, frames: list[str]) -> None:
+    """Regular text output, plus annotation-based hosted tool detection.
+
+    A url_citation or file_citation annotation proves the hosted tool was
+    used even if its raw events were missed.
+    """
+    if not content.text:
+        return
+    state.flush_tool_events_into(frames)
+    frames.append(content.text)
+
+    for ann in content.annotations or []:
+        ann_type = getattr(ann, "type", "")
+        if "url_citation" in ann_type and not state.detected("web_search"):
+            tool_name, item_id = "web_search", "ws_annotation"
+        elif "file_citation" in ann_type and not state.detected("file_search"):
+            tool_name, item_id = "file_search", "fs_annotation"
+        else:
+            continue
+        state.emit_start(tool_name, item_id)
+        state.emit_end(tool_name, item_id)
+
+
+def _on_usage(content: Any, state: StreamState, frames: list[str]) -> None:
+    """Extract hosted tool usage from ResponseCompletedEvent.
+
+    The SDK sends a "usage" Content item whose raw_representation contains
+    the full ResponseCompletedEvent with Response.output.  This is our most
+    reliable way to detect hosted tools (web_search, file_search, MCP) since
+    the SDK does NOT expose their individual streaming events as
+    AgentResponseUpdate objects.
+    """
+    raw = content.raw_representation
+    resp = getattr(raw, "response", None) if raw is not None else None
+    if resp is None:
+        return
+    for out_item in getattr(resp, "output", []):
+        item_type = getattr(out_item, "type", "")
+        tool_name = _match_hosted_tool(item_type)
+        if tool_name:
+            iid = getattr(out_item, "id", "") or tool_name
+            logger.info(
+                "Hosted tool from Response.output: type=%s → %s (id=%s)",
+                item_type,
+                tool_name,
+                iid,
+            )
+            state.emit_start(tool_name, iid)
+            state.emit_end(tool_name, iid)
+
+
+_HANDLERS: dict[str, Callable[[Any, StreamState, list[str]], None]] = {
+    "text_reasoning": _on_text_reasoning,
+    "function_call": _on_function_call,
+    "function_result": _on_function_result,
+    "text": _on_text,
+    "usage": _on_usage,
+    **dict.fromkeys(_HOSTED_CT, _on_hosted_content),
+}
+
+
+def _history_prefix(history: list[dict] | None) -> str:
+    """Format the last HISTORY_CONTEXT_MESSAGES for multi-turn context."""
+    if not history:
+        return ""
+    text = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[-HISTORY_CONTEXT_MESSAGES:])
+    return f"Previous conversation:\n{text}\n\n"
+
+
+@lru_cache(maxsize=32)
+def _token_budgets(platforms: tuple[str, ...]) -> str:
+    """Format the per-post token budgets for a platform selection (cached)."""
+    return ", ".join(f"{p} {_POST_TOKEN_BUDGET.get(p, _DEFAULT_POST_TOKEN_BUDGET)}" for p in platforms)
 
 
 def _build_query_with_context(
@@ -111,70 +446,74 @@ def _build_query_with_context(
     Returns:
         Formatted query string.
     """
-    parts = []
-
-    # Add conversation history if available
-    if history:
-        history_text = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[-6:])
-        parts.append(f"Previous conversation:\n{history_text}\n")
-
-    # Build the current request
-    platform_list = ", ".join(platforms)
-    parts.append(
+    return (
+        f"{_history_prefix(history)}"
         f"Create social media content for the following:\n"
         f"- Topic: {message}\n"
-        f"- Platforms: {platform_list}\n"
+        f"- Platforms: {', '.join(platforms)}\n"
         f"- Content type: {content_type}\n"
         f"- Language: {language}\n"
+        f"\nConstraint: be concise. Approximate token budget per post body: {_token_budgets(tuple(platforms))}\n"
     )
 
-    return "\n".join(parts)
 
+@lru_cache(maxsize=32)
+def _reasoning_options(reasoning_effort: str, reasoning_summary: str) -> dict | None:
+    """Build agent default_options with gpt-5.2 reasoning settings.
 
-async def run_agent_stream(
-    message: str,
-    platforms: list[str],
-    content_type: str,
-    language: str,
-    history: list[dict] | None = None,
-    reasoning_effort: str = "medium",
-    reasoning_summary: str = "auto",
-    ab_mode: bool = False,
-    bilingual: bool = False,
-    bilingual_style: str = "parallel",
-) -> AsyncIterator[str]:
-    """Execute the agent and yield SSE-formatted events.
+    Cached per (effort, summary); the agent copies the dict it is given.
+    """
+    reasoning_opts: dict = {}
+    if reasoning_effort and reasoning_effort != "off":
+        reasoning_opts["effort"] = reasoning_effort
+    if reasoning_summary and reasoning_summary != "off":
+        reasoning_opts["summary"] = reasoning_summary
+    return {"reasoning": reasoning_opts} if reasoning_opts else None
 
-    Streams reasoning tokens, tool events, and text content via markers:
-    - __REASONING_REPLACE__...__END_REASONING_REPLACE__ for thinking
-    - __TOOL_EVENT__...__END_TOOL_EVENT__ for tool usage
-    - Plain text for content
 
-    Args:
-        message: User's input message.
-        platforms: Target platforms.
-        content_type: Content type.
-        language: Output language.
-        history: Conversation history for multi-turn.
-        reasoning_effort: GPT-5 reasoning depth (low/medium/high).
-        reasoning_summary: Thinking display mode (off/auto/concise/detailed).
-        ab_mode: If True, generate two content variants for A/B comparison.
-        bilingual: If True, generate content in both English and Japanese.
-        bilingual_style: "parallel" (separate posts) or "combined" (EN+JA in one post).
+@lru_cache(maxsize=1)
+def _raw_event_attr(update_cls: type) -> str:
+    """Name of the attribute that carries the raw OpenAI stream event.
 
-    Yields:
-        SSE-formatted strings for each event type.
+    Some SDK versions use ``raw_event`` instead of ``raw_representation``.
+    It is an instance attribute, so probe the constructor signature rather
+    than the class.
     """
-    client = get_client()
+    params = inspect.signature(update_cls.__init__).parameters
+    return "raw_representation" if "raw_representation" in params else "raw_event"
 
-    # Get hosted tools
+
+@lru_cache(maxsize=1)
+def _tool_config() -> tuple[str, str, bool]:
+    """Tool-related settings, read once: (vector store id, MCP URL, Foundry IQ configured).
+
+    All three come from environment variables loaded at startup, so they
+    cannot change while the process runs.
+    """
+    from src.agentic_retrieval import is_configured as _iq_configured
+
+    return (config.VECTOR_STORE_ID, config.MCP_SERVER_URL, _iq_configured())
+
+
+@lru_cache(maxsize=4)
+def _build_tools(vector_store_id: str, mcp_server_url: str, iq_configured: bool) -> tuple:
+    """Build the agent tool list for the given configuration.
+
+    Cached per configuration: the hosted tool descriptors and the tool
+    list never change between requests in a running instance.
+    """
+    from agent_framework.azure import AzureOpenAIResponsesClient  # type: ignore[attr-defined]
+
+    from src.agentic_retrieval import search_knowledge_base
+    from src.tools import generate_content, generate_image, review_content
+
+    # Hosted tools
     web_search_tool = AzureOpenAIResponsesClient.get_web_search_tool()
 
     # Build tool list
     tools = [web_search_tool, generate_content, review_content, generate_image]
 
     # Add file_search if Vector Store is configured
-    vector_store_id = config.VECTOR_STORE_ID
     if vector_store_id:
         file_search_tool = AzureOpenAIResponsesClient.get_file_search_tool(
             vector_store_ids=[vector_store_id],
@@ -185,10 +524,10 @@ async def run_agent_stream(
         logger.warning("VECTOR_STORE_ID not set — file_search tool disabled. Run vector_store.py to create one.")
 
     # Add MCP tool (Microsoft Learn documentation)
-    if config.MCP_SERVER_URL:
+    if mcp_server_url:
         mcp_tool = AzureOpenAIResponsesClient.get_mcp_tool(
             name="microsoft_learn",
-            url=config.MCP_SERVER_URL,
+            url=mcp_server_url,
             description=(
                 "Search and retrieve official Microsoft Learn documentation, "
                 "code samples, and technical guides. Use for verifying facts, "
@@ -202,12 +541,12 @@ async def run_agent_stream(
             ],
         )
         tools.append(mcp_tool)
-        logger.info("MCP tool enabled (url=%s)", config.MCP_SERVER_URL)
+        logger.info("MCP tool enabled (url=%s)", mcp_server_url)
     else:
         logger.info("MCP_SERVER_URL not configured — MCP tool disabled")
 
     # Add Foundry IQ Agentic Retrieval if configured
-    if _iq_configured():
+    if iq_configured:
         tools.append(search_knowledge_base)
         logger.info(
             "Foundry IQ tool enabled (endpoint=%s, kb=%s)",
@@ -217,26 +556,171 @@ async def run_agent_stream(
     else:
         logger.info("Foundry IQ not configured — search_knowledge_base tool disabled")
 
-    # Build reasoning options for gpt-5.2
-    reasoning_opts: dict = {}
-    if reasoning_effort and reasoning_effort != "off":
-        reasoning_opts["effort"] = reasoning_effort
-    if reasoning_summary and reasoning_summary != "off":
-        reasoning_opts["summary"] = reasoning_summary
+    return tuple(tools)
+
+
+@lru_cache(maxsize=32)
+def _get_agent(
+    tool_config: tuple[str, str, bool],
+    reasoning_effort: str,
+    reasoning_summary: str,
+    ab_mode: bool,
+    bilingual: bool,
+    bilingual_style: str,
+):
+    """Create the agent for one tool/prompt/reasoning configuration.
 
-    default_options: dict = {}
-    if reasoning_opts:
-        default_options["reasoning"] = reasoning_opts
+    Cached per configuration: run() without a thread starts a fresh thread
+    and copies the default options, so one instance serves every request.
+    """
+    from src.client import get_client
 
-    # Create agent with all tools (hosted + custom @tool)
-    system_prompt = get_system_prompt(ab_mode=ab_mode, bilingual=bilingual, bilingual_style=bilingual_style)
-    agent = client.as_agent(
+    return get_client().as_agent(
         name="social_ai_studio_agent",
-        instructions=system_prompt,
-        tools=tools,
-        default_options=default_options if default_options else None,
+        instructions=get_system_prompt(ab_mode=ab_mode, bilingual=bilingual, bilingual_style=bilingual_style),
+        tools=list(_build_tools(*tool_config)),
+        default_options=_reasoning_options(reasoning_effort, reasoning_summary),
     )
 
+
+async def _buffered(source: AsyncGenerator[str], maxsize: int = STREAM_BUFFER_FRAMES) -> AsyncIterator[str]:
+    """Consume ``source`` in a background task through a bounded queue.
+
+    The model stream keeps flowing while a slow client drains earlier
+    frames.  Errors from ``source`` are re-raised here; closing this
+    generator cancels the producer.
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+
+    async def _drain() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await queue.put(_STREAM_DONE)
+            raise
+        else:
+            await queue.put(_STREAM_DONE)
+        finally:
+            await source.aclose()
+
+    producer = asyncio.create_task(_drain())
+    try:
+        while (item := await queue.get()) is not _STREAM_DONE:
+            yield item
+        await producer  # re-raise a producer error
+    finally:
+        producer.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await producer
+
+
+async def run_agent_stream(
+    message: str,
+    platforms: list[str],
+    content_type: str,
+    language: str,
+    history: list[dict] | None = None,
+    reasoning_effort: str = "medium",
+    reasoning_summary: str = "auto",
+    ab_mode: bool = False,
+    bilingual: bool = False,
+    bilingual_style: str = "parallel",
+) -> AsyncIterator[str]:
+    """Execute the agent and yield SSE-formatted events.
+
+    Streams reasoning tokens, tool events, and text content via markers:
+    - __REASONING_REPLACE__...__END_REASONING_REPLACE__ for thinking
+    - __TOOL_EVENT__...__END_TOOL_EVENT__ for tool usage
+    - Plain text for content
+
+    Args:
+        message: User's input message.
+        platforms: Target platforms.
+        content_type: Content type.
+        language: Output language.
+        history: Conversation history for multi-turn.
+        reasoning_effort: GPT-5 reasoning depth (low/medium/high).
+        reasoning_summary: Thinking display mode (off/auto/concise/detailed).
+        ab_mode: If True, generate two content variants for A/B comparison.
+        bilingual: If True, generate content in both English and Japanese.
+        bilingual_style: "parallel" (separate posts) or "combined" (EN+JA in one post).
+
+    Yields:
+        SSE-formatted strings for each event type.
+    """
+    # Single-turn requests may be served from the response cache.  High
+    # reasoning effort is never cached; neither are runs that produced images.
+    cache_key = None
+    if not history and reasoning_effort != "high" and response_cache.is_enabled():
+        cache_key = response_cache.make_key(
+            message,
+            platforms,
+            content_type,
+            language,
+            reasoning_effort,
+            reasoning_summary,
+            ab_mode,
+            bilingual,
+            bilingual_style,
+        )
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Response cache hit (key=%s)", cache_key)
+            for chunk in cached:
+                yield chunk
+            return
+
+    recorded: list[str] = []
+    async for chunk in _buffered(
+        _run_agent_stream(
+            message=message,
+            platforms=platforms,
+            content_type=content_type,
+            language=language,
+            history=history,
+            reasoning_effort=reasoning_effort,
+            reasoning_summary=reasoning_summary,
+            ab_mode=ab_mode,
+            bilingual=bilingual,
+            bilingual_style=bilingual_style,
+        )
+    ):
+        if cache_key is not None:
+            recorded.append(chunk)
+        yield chunk
+
+    # Reached only when the stream completed without raising
+    if cache_key is not None and not any(IMAGE_DATA_START in chunk for chunk in recorded):
+        response_cache.put(cache_key, recorded)
+
+
+async def _run_agent_stream(
+    message: str,
+    platforms: list[str],
+    content_type: str,
+    language: str,
+    history: list[dict] | None = None,
+    reasoning_effort: str = "medium",
+    reasoning_summary: str = "auto",
+    ab_mode: bool = False,
+    bilingual: bool = False,
+    bilingual_style: str = "parallel",
+) -> AsyncIterator[str]:
+    """Run the agent for one request without caching; see run_agent_stream()."""
+    # Lazy imports: agent_framework (and the tool modules built on it) take
+    # most of this module's import time, and only a running request needs them.
+    from agent_framework import AgentResponseUpdate
+
+    from src.tools import init_image_store, pop_pending_images
+
+    # Agent with all tools (hosted + custom @tool), reused across requests
+    tool_config = _tool_config()
+    agent = _get_agent(tool_config, reasoning_effort, reasoning_summary, ab_mode, bilingual, bilingual_style)
+    tools = _build_tools(*tool_config)
+
     # Build the full query
     query = _build_query_with_context(message, platforms, content_type, language, history)
     logger.info("Agent processing: %s... (platforms=%s)", message[:80], platforms)
@@ -258,58 +742,13 @@ async def run_agent_stream(
         },
     )
     ctx = trace.set_span_in_context(pipeline_span)
-    _tool_spans: dict[str, trace.Span] = {}  # call_id → span
+    state = StreamState(tracer=tracer, ctx=ctx, emit_reasoning=reasoning_summary not in ("", "off"))
 
-    # Accumulate reasoning text (SDK sends deltas; we accumulate + REPLACE)
-    accumulated_reasoning = ""
-    last_reasoning_send = 0.0
+    # Attribute carrying the raw OpenAI event, resolved once per process
+    raw_attr = _raw_event_attr(AgentResponseUpdate)
 
-    def _should_send_reasoning() -> bool:
-        nonlocal last_reasoning_send
-        now = time.time() * 1000
-        if now - last_reasoning_send >= REASONING_THROTTLE_MS:
-            last_reasoning_send = now
-            return True
-        return False
-
-    # Track tool calls already emitted to avoid duplicates
-    # (each streaming update re-sends the same function_call content)
-    emitted_tool_starts: set[str] = set()
-    emitted_tool_ends: set[str] = set()
-    # Map call_id → tool_name (function_result may not carry the name)
-    call_id_to_name: dict[str, str] = {}
-    # Track which hosted tool NAMES have been detected
-    _detected_hosted: set[str] = set()
-
-    # ----- helpers for hosted tool event emission -----
-    def _emit_start(tool_name: str, item_id: str) -> str | None:
-        if item_id not in emitted_tool_starts:
-            emitted_tool_starts.add(item_id)
-            call_id_to_name[item_id] = tool_name
-            _detected_hosted.add(tool_name)
-            return create_tool_event(tool_name, "started")
-        return None
-
-    def _emit_end(tool_name: str, item_id: str) -> str | None:
-        if item_id not in emitted_tool_ends:
-            emitted_tool_ends.add(item_id)
-            _detected_hosted.add(tool_name)
-            # Ensure start was emitted first
-            if item_id not in emitted_tool_starts:
-                emitted_tool_starts.add(item_id)
-                call_id_to_name[item_id] = tool_name
-            return create_tool_event(tool_name, "completed")
-        return None
-
-    # Mapping of raw event substrings → canonical tool names
-    _HOSTED_PATTERNS: dict[str, str] = {
-        "web_search_call": "web_search",
-        "web_search": "web_search",
-        "file_search_call": "file_search",
-        "file_search": "file_search",
-        "mcp_call": "mcp_search",
-        "mcp_list_tools": "mcp_search",
-    }
+    # Resolved once per stream: raw events arrive with nearly every update
+    log_raw_events = logger.isEnabledFor(logging.DEBUG)
 
     try:
         # Initialize per-request image store (side-channel for generate_image)
@@ -349,142 +788,32 @@ async def run_agent_stream(
         stream_result = StreamResult()
 
         async for update in stream:
-            # Each update is an AgentResponseUpdate with .contents list
-            if not isinstance(update, AgentResponseUpdate):
+            # Each update is an AgentResponseUpdate with .contents list.
+            # Exact-class identity first; isinstance() only for subclasses.
+            if update.__class__ is not AgentResponseUpdate and not isinstance(update, AgentResponseUpdate):
                 # Fallback: yield as text
                 text = str(update)
                 if text:
                     yield text
                 continue
 
-            # Process each Content item in the update
-            for content in update.contents or []:
-                ct = getattr(content, "type", None)
-
-                if ct == "text_reasoning" and content.text:
-                    # GPT-5 reasoning token — accumulate and throttle
-                    if accumulated_reasoning and content.text.startswith(accumulated_reasoning):
-                        # SDK sent cumulative text — replace
-                        accumulated_reasoning = content.text
-                    elif accumulated_reasoning.endswith(content.text):
-                        # Duplicate delta — ignore
-                        pass
-                    else:
-                        # True delta — append
-                        accumulated_reasoning += content.text
-
-                    if _should_send_reasoning():
-                        yield (f"{REASONING_START}{accumulated_reasoning}{REASONING_END}")
-
-                elif ct == "function_call":
-                    # Tool being invoked — emit only once per call_id
-                    tool_name = getattr(content, "name", None) or "unknown_tool"
-                    call_id = getattr(content, "call_id", None) or tool_name
-                    # Remember for later function_result lookup
-                    if tool_name != "unknown_tool":
-                        call_id_to_name[call_id] = tool_name
-                    if call_id not in emitted_tool_starts:
-                        emitted_tool_starts.add(call_id)
-                        # OTel: start tool span
-                        _tool_spans[call_id] = tracer.start_span(
-                            f"tool.{tool_name}",
-                            context=ctx,
-                            attributes={"tool.name": tool_name},
-                        )
-                        yield create_tool_event(tool_name, "started")
-
-                elif ct == "function_result":
-                    # Tool returned result — emit only once per call_id
-                    call_id = getattr(content, "call_id", None) or ""
-                    # Resolve name from call_id map (function_result often lacks .name)
-                    tool_name = getattr(content, "name", None) or call_id_to_name.get(call_id) or "unknown_tool"
-
-                    # Note: Image data is captured via ContextVar side-channel
-                    # in tools.py, so we don't need to extract it from
-                    # function_result (which may be truncated by the SDK).
-
-                    if call_id and call_id not in emitted_tool_ends:
-                        emitted_tool_ends.add(call_id)
-                        # OTel: end tool span
-                        sp = _tool_spans.pop(call_id, None)
-                        if sp:
-                            sp.end()
-                        yield create_tool_event(tool_name, "completed")
-
-                elif ct in (
-                    "web_search_call",
-                    "file_search_call",
-                    "mcp_call",
-                    "mcp_list_tools",
-                ):
-                    # Hosted tool exposed as a Content item (some SDK versions)
-                    tool_name = _HOSTED_PATTERNS.get(ct, "unknown_tool")
-                    item_id = getattr(content, "id", "") or getattr(content, "call_id", "") or tool_name
-                    ev = _emit_start(tool_name, item_id)
-                    if ev:
-                        yield ev
-
-                elif ct == "text" and content.text:
-                    # Regular text output
-                    yield content.text
-
-                    # --- Annotation-based hosted tool detection ---
-                    # When text contains url_citation or file_citation,
-                    # it proves the hosted tool was used even if we
-                    # missed the raw events.
-                    annotations = getattr(content, "annotations", None) or []
-                    for ann in annotations:
-                        ann_type = getattr(ann, "type", "")
-                        if "url_citation" in ann_type and "web_search" not in _detected_hosted:
-                            ev = _emit_start("web_search", "ws_annotation")
-                            if ev:
-                                yield ev
-                            ev = _emit_end("web_search", "ws_annotation")
-                            if ev:
-                                yield ev
-                        elif "file_citation" in ann_type and "file_search" not in _detected_hosted:
-                            ev = _emit_start("file_search", "fs_annotation")
-                            if ev:
-                                yield ev
-                            ev = _emit_end("file_search", "fs_annotation")
-                            if ev:
-                                yield ev
-
-                elif ct == "usage":
-                    # ---- Extract hosted tool usage from ResponseCompletedEvent ----
-                    # The SDK sends a "usage" Content item whose raw_representation
-                    # contains the full ResponseCompletedEvent with Response.output.
-                    # This is our most reliable way to detect hosted tools (web_search,
-                    # file_search, MCP) since the SDK does NOT expose their individual
-                    # streaming events as AgentResponseUpdate objects.
-                    raw = getattr(content, "raw_representation", None)
-                    resp = None
-                    if raw is not None:
-                        resp = getattr(raw, "response", None)
-                    if resp is not None:
-                        for out_item in getattr(resp, "output", []):
-                            item_type = getattr(out_item, "type", "")
-                            for pattern, tool_name in _HOSTED_PATTERNS.items():
-                                if pattern in item_type:
-                                    iid = getattr(out_item, "id", "") or tool_name
-                                    logger.info(
-                                        "Hosted tool from Response.output: type=%s → %s (id=%s)",
-                                        item_type,
-                                        tool_name,
-                                        iid,
-                                    )
-                                    ev = _emit_start(tool_name, iid)
-                                    if ev:
-                                        yield ev
-                                    ev = _emit_end(tool_name, iid)
-                                    if ev:
-                                        yield ev
-                                    break
+            # Frames produced by this update are joined and yielded once,
+            # so a burst of tool/reasoning/text frames costs a single send.
+            frames: list[str] = []
+            state.update_ts = None
 
-                else:
+            # Process each Content item in the update via the handler table
+            for content in update.contents or ():
+                try:
+                    ct = content.type
+                except AttributeError:
+                    continue
+                handler = _HANDLERS.get(ct)
+                if handler is not None:
+                    handler(content, state, frames)
+                elif ct:
                     # Unknown content type — log for debugging
-                    if ct:
-                        logger.debug("Unknown content type: %s", ct)
+                    logger.debug("Unknown content type: %s", ct)
 
             # ---------------------------------------------------------
             # Detect hosted tool events from raw OpenAI stream event.
@@ -492,10 +821,9 @@ async def run_agent_stream(
             # Content objects.  We inspect raw_representation to catch
             # web_search_call, file_search_call, and mcp_call events.
             # ---------------------------------------------------------
-            raw_event = getattr(update, "raw_representation", None)
-            # Some SDK versions use different attribute names
-            if raw_event is None:
-                raw_event = getattr(update, "raw_event", None)
+            # web_search is always registered, so this block can never be
+            # skipped outright; only the per-event debug logging is optional.
+            raw_event = getattr(update, raw_attr, None)
 
             if raw_event is not None:
                 # Extract type string from raw event (handle dict or object)
@@ -505,15 +833,11 @@ async def run_agent_stream(
                     raw_type = str(getattr(raw_event, "type", ""))
 
                 # Log ALL raw events (not just search-related) for debugging
-                if raw_type:
+                if log_raw_events and raw_type:
                     logger.debug("Raw stream event: type=%s", raw_type)
 
                 # --- Unified hosted tool detection from raw_type ---
-                matched_tool = None
-                for pattern, tool_name in _HOSTED_PATTERNS.items():
-                    if pattern in raw_type:
-                        matched_tool = tool_name
-                        break
+                matched_tool = _match_hosted_tool(raw_type)
 
                 if matched_tool:
                     logger.info(
@@ -542,13 +866,9 @@ async def run_agent_stream(
                     # Emit start or end based on event type
                     is_completed = "completed" in raw_type or "done" in raw_type
                     if is_completed:
-                        ev = _emit_end(matched_tool, item_id)
-                        if ev:
-                            yield ev
+                        state.emit_end(matched_tool, item_id)
                     else:
-                        ev = _emit_start(matched_tool, item_id)
-                        if ev:
-                            yield ev
+                        state.emit_start(matched_tool, item_id)
 
                 # --- Also check for output_item events with hosted tool items ---
                 if "output_item" in raw_type:
@@ -559,28 +879,31 @@ async def run_agent_stream(
                         item = getattr(raw_event, "item", None)
                         item_type = str(getattr(item, "type", "")) if item else ""
 
-                    for pattern, tool_name in _HOSTED_PATTERNS.items():
-                        if pattern in item_type:
-                            if isinstance(item, dict):
-                                iid = str(item.get("id", "")) or tool_name
-                            else:
-                                iid = str(getattr(item, "id", "")) if item else tool_name
-
-                            if "done" in raw_type:
-                                ev = _emit_end(tool_name, iid)
-                                if ev:
-                                    yield ev
-                            else:
-                                ev = _emit_start(tool_name, iid)
-                                if ev:
-                                    yield ev
-                            break
+                    tool_name = _match_hosted_tool(item_type)
+                    if tool_name:
+                        if isinstance(item, dict):
+                            iid = str(item.get("id", "")) or tool_name
+                        else:
+                            iid = str(getattr(item, "id", "")) if item else tool_name
+
+                        if "done" in raw_type:
+                            state.emit_end(tool_name, iid)
+                        else:
+                            state.emit_start(tool_name, iid)
 
             # Fallback: if update has .text but no contents processed
             if not update.contents and update.text:
-                yield update.text
+                state.flush_tool_events_into(frames)
+                frames.append(update.text)
+
+            # Tool events queued after the last text/reasoning frame
+            state.flush_tool_events_into(frames)
+
+            if frames:
+                yield "".join(frames)
 
         # ---- Post-stream: synthesize events for configured but undetected tools ----
+        state.update_ts = None
         # If a hosted tool was configured but no events were detected during
         # streaming, inspect the final response for evidence of usage and emit
         # synthetic events so the frontend always shows what tools ran.
@@ -590,22 +913,21 @@ async def run_agent_stream(
                 response = stream_response
                 for output_item in getattr(response, "output", []):
                     item_type = getattr(output_item, "type", "")
-                    for pattern, tool_name in _HOSTED_PATTERNS.items():
-                        if pattern in item_type and tool_name not in _detected_hosted:
-                            iid = getattr(output_item, "id", "") or tool_name
-                            ev = _emit_start(tool_name, iid)
-                            if ev:
-                                yield ev
-                            ev = _emit_end(tool_name, iid)
-                            if ev:
-                                yield ev
-                            break
+                    tool_name = _match_hosted_tool(item_type)
+                    if tool_name and not state.detected(tool_name):
+                        iid = getattr(output_item, "id", "") or tool_name
+                        state.emit_start(tool_name, iid)
+                        state.emit_end(tool_name, iid)
             except (AttributeError, TypeError):
                 pass  # best-effort
+            tool_frame = state.flush_tool_events()
+            if tool_frame:
+                yield tool_frame
 
-        # Send final accumulated reasoning
-        if accumulated_reasoning:
-            yield (f"{REASONING_START}{accumulated_reasoning}{REASONING_END}")
+        # Send final accumulated reasoning if the throttle held some back
+        # (REPLACE reconciles the client); otherwise it already has it all
+        if state.pending_reasoning:
+            yield _reasoning_frame("".join(state.reasoning_parts))
 
         # ---- Emit extracted image data as special markers ----
         # Primary: images stored via ContextVar side-channel in tools.py
@@ -615,11 +937,7 @@ async def run_agent_stream(
 
         if all_images:
             for platform, b64 in all_images.items():
-                image_event = json.dumps(
-                    {"platform": platform, "image_base64": b64},
-                    ensure_ascii=False,
-                )
-                yield f"{IMAGE_DATA_START}{image_event}{IMAGE_DATA_END}"
+                yield _image_frame(platform, b64)
             logger.info(
                 "Emitted %d image(s): %s",
                 len(all_images),
@@ -629,13 +947,17 @@ async def run_agent_stream(
         # ---- Finalize OTel pipeline span ----
         pipeline_span.set_attribute(
             "tools.used",
-            ",".join(sorted(_detected_hosted | set(call_id_to_name.values()))),
+            ",".join(
+                sorted(
+                    {k for k, v in state.tool_state.items() if v & _TOOL_DETECTED} | set(state.call_id_to_name.values())
+                )
+            ),
         )
-        pipeline_span.set_attribute("reasoning.chars", len(accumulated_reasoning))
+        pipeline_span.set_attribute("reasoning.chars", state.reasoning_len)
         pipeline_span.set_status(trace.StatusCode.OK)
         pipeline_span.end()
         # End any lingering tool spans
-        for sp in _tool_spans.values():
+        for sp in state.tool_spans.values():
             sp.end()
 
     except Exception as e:
@@ -657,5 +979,5 @@ async def run_agent_stream(
             "type": "error",
             "message": user_message,
         }
-        yield json.dumps(error_event, ensure_ascii=False) + "\n\n"
+        yield orjson.dumps(error_event).decode() + "\n\n"
         raise
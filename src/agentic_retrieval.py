@@ -20,14 +20,17 @@ Reference:
     https://learn.microsoft.com/en-us/azure/search/agentic-retrieval-how-to-set-retrieval-reasoning-effort
 """
 
-import json
+import asyncio
+import io
 import logging
 from enum import StrEnum
 from typing import Annotated, Any
 
 import httpx
+import orjson
 from agent_framework import tool
 
+from src.async_cache import AsyncTTLCache
 from src.config import AI_SEARCH_API_KEY, AI_SEARCH_ENDPOINT, AI_SEARCH_KNOWLEDGE_BASE_NAME, AI_SEARCH_REASONING_EFFORT
 
 logger = logging.getLogger(__name__)
@@ -44,6 +47,50 @@ class ReasoningEffort(StrEnum):
 # API version for Agentic Retrieval
 API_VERSION = "2025-11-01-preview"
 
+# Tool output limits (characters of source content) to keep the agent's
+# context small: per source, and across all sources of one result
+_MAX_SOURCE_CHARS = 2000
+_MAX_RESULT_CHARS = 12000
+# Response bodies above this size are parsed in a worker thread
+_INLINE_PARSE_MAX_BYTES = 64 * 1024
+
+# Result cache: identical (query, effort) pairs within the TTL reuse the
+# previous result, and concurrent identical calls share one upstream request.
+_CACHE_TTL_S = 300.0
+_CACHE_MAX_ENTRIES = 256
+_cache: AsyncTTLCache[tuple[str, str], dict[str, Any]] = AsyncTTLCache(
+    "Foundry IQ",
+    _CACHE_TTL_S,
+    _CACHE_MAX_ENTRIES,
+    cacheable=lambda result: "error" not in result,
+)
+
+# Shared HTTP client (lazy init) so retrievals reuse pooled TLS connections
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared AsyncClient."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _http_client
+
+
+async def aclose() -> None:
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Managed identity scope for AI Search
+_SEARCH_SCOPE = "https://search.azure.com/.default"
+
 
 def is_configured() -> bool:
     """Check if Foundry IQ is configured."""
@@ -57,6 +104,9 @@ async def retrieve(
 ) -> dict[str, Any]:
     """Retrieve documents from Knowledge Base using Agentic Retrieval.
 
+    Successful results are cached per (normalized query, effort) for
+    ``_CACHE_TTL_S`` seconds; concurrent identical calls share one request.
+
     Args:
         query: The search query.
         reasoning_effort: Override default effort (minimal/low/medium).
@@ -69,6 +119,12 @@ async def retrieve(
         return {"error": "Foundry IQ not configured (AI_SEARCH_* env vars missing)"}
 
     effort = reasoning_effort or AI_SEARCH_REASONING_EFFORT
+    key = (query.strip().lower(), effort)
+    return await _cache.get_or_fetch(key, lambda: _retrieve_uncached(query, effort))
+
+
+async def _retrieve_uncached(query: str, effort: str) -> dict[str, Any]:
+    """Call the Knowledge Base retrieve API (no caching)."""
     endpoint = AI_SEARCH_ENDPOINT.rstrip("/")
     kb_name = AI_SEARCH_KNOWLEDGE_BASE_NAME
 
@@ -103,99 +159,104 @@ async def retrieve(
         headers["api-key"] = AI_SEARCH_API_KEY
     else:
         try:
-            from azure.identity import DefaultAzureCredential
+            from src.client import get_token
 
-            credential = DefaultAzureCredential()
-            token = credential.get_token("https://search.azure.com/.default")
-            headers["Authorization"] = f"Bearer {token.token}"
+            headers["Authorization"] = f"Bearer {await get_token(_SEARCH_SCOPE)}"
         except Exception as e:
             logger.error("Failed to get search token: %s", e)
             return {"error": f"Authentication failed: {e}"}
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=body, headers=headers)
-
-            if response.status_code not in (200, 206):
-                error_text = response.text
-                logger.error(
-                    "Agentic Retrieval failed: %s - %s",
-                    response.status_code,
-                    error_text,
-                )
-                return {"error": f"Search failed: {response.status_code}"}
-
-            result = response.json()
+        response = await _get_http_client().post(url, json=body, headers=headers)
+
+        if response.status_code not in (200, 206):
+            error_text = response.text
+            logger.error(
+                "Agentic Retrieval failed: %s - %s",
+                response.status_code,
+                error_text,
+            )
+            return {"error": f"Search failed: {response.status_code}"}
 
-        # Parse response
-        return _parse_response(result, effort)
+        # Parse response; large bodies off the event loop so concurrent
+        # streams are not stalled (small ones are cheaper to parse inline)
+        raw = response.content
+        if len(raw) <= _INLINE_PARSE_MAX_BYTES:
+            return _parse_body(raw, effort)
+        return await asyncio.to_thread(_parse_body, raw, effort)
 
     except Exception as e:
         logger.error("Agentic Retrieval error: %s", e)
         return {"error": str(e)}
 
 
+def _parse_body(body: bytes, effort: str) -> dict[str, Any]:
+    """Decode and parse a raw Agentic Retrieval response body."""
+    return _parse_response(orjson.loads(body), effort)
+
+
+def _chunk_source(chunk: dict) -> dict:
+    """Build a source entry from an extractiveData chunk."""
+    md = chunk.get("metadata") or {}
+    return {
+        "content": chunk.get("content", ""),
+        "source": md.get("url", ""),
+        "title": md.get("title", ""),
+        "score": chunk.get("rerankerScore", 0),
+    }
+
+
 def _parse_response(response: dict, effort: str) -> dict[str, Any]:
     """Parse Agentic Retrieval response into structured format."""
     response_data = response.get("response", [])
     activity = response.get("activity", [])
     references = response.get("references", [])
 
+    # Reference scores/titles keyed by ref_id, applied while building sources
+    ref_map = {str(ref.get("id", "")): ref for ref in references}
+
     sources: list[dict] = []
     for item in response_data:
-        content_list = item.get("content", [])
-        for content_item in content_list:
-            if content_item.get("type") == "text":
-                text = content_item.get("text", "")
-                try:
-                    parsed = json.loads(text)
-                    if isinstance(parsed, list):
-                        # Minimal mode returns a JSON array of {ref_id, title, content}
-                        for doc in parsed:
-                            sources.append(
-                                {
-                                    "content": doc.get("content", ""),
-                                    "source": "",
-                                    "title": doc.get("title", ""),
-                                    "score": 0,
-                                    "ref_id": doc.get("ref_id"),
-                                }
-                            )
-                    elif isinstance(parsed, dict):
-                        if "extractiveData" in parsed:
-                            chunks = parsed["extractiveData"].get("chunks", [])
-                            for chunk in chunks:
-                                sources.append(
-                                    {
-                                        "content": chunk.get("content", ""),
-                                        "source": chunk.get("metadata", {}).get("url", ""),
-                                        "title": chunk.get("metadata", {}).get("title", ""),
-                                        "score": chunk.get("rerankerScore", 0),
-                                    }
-                                )
-                        else:
-                            # Single document object
-                            sources.append(
-                                {
-                                    "content": parsed.get("content", text),
-                                    "source": parsed.get("source", ""),
-                                    "title": parsed.get("title", ""),
-                                    "score": parsed.get("rerankerScore", 0),
-                                }
-                            )
-                except (json.JSONDecodeError, TypeError):
-                    if text.strip():
-                        sources.append({"content": text, "source": "", "title": "", "score": 0})
-
-    # Enrich sources with reference scores
-    ref_map = {str(ref.get("id", "")): ref for ref in references}
-    for source in sources:
-        ref_id = str(source.get("ref_id", ""))
-        if ref_id in ref_map:
-            ref = ref_map[ref_id]
-            source["score"] = ref.get("rerankerScore", source.get("score", 0))
-            if not source.get("title") and ref.get("title"):
-                source["title"] = ref["title"]
+        for content_item in item.get("content", []):
+            if content_item.get("type") != "text":
+                continue
+            text = content_item.get("text", "")
+            try:
+                parsed = orjson.loads(text)
+            except (orjson.JSONDecodeError, TypeError):
+                if text.strip():
+                    sources.append({"content": text, "source": "", "title": "", "score": 0})
+                continue
+
+            if isinstance(parsed, list):
+                # Minimal mode returns a JSON array of {ref_id, title, content}
+                for doc in parsed:
+                    ref_id = doc.get("ref_id")
+                    ref = ref_map.get(str(ref_id)) or {}
+                    sources.append(
+                        {
+                            "content": doc.get("content", ""),
+                            "source": "",
+                            # Fall back to the reference title, else ""
+                            "title": doc.get("title") or ref.get("title") or "",
+                            "score": ref.get("rerankerScore", 0),
+                            "ref_id": ref_id,
+                        }
+                    )
+            elif isinstance(parsed, dict):
+                if "extractiveData" in parsed:
+                    chunks = parsed["extractiveData"].get("chunks", [])
+                    sources.extend(_chunk_source(chunk) for chunk in chunks)
+                else:
+                    # Single document object
+                    sources.append(
+                        {
+                            "content": parsed.get("content", text),
+                            "source": parsed.get("source", ""),
+                            "title": parsed.get("title", ""),
+                            "score": parsed.get("rerankerScore", 0),
+                        }
+                    )
 
     # Parse activity summary
     activity_summary = []
@@ -235,21 +296,29 @@ def _format_results(result: dict) -> str:
     if not sources:
         return "関連するドキュメントが見つかりませんでした。"
 
-    formatted = []
+    buf = io.StringIO()
+    budget = _MAX_RESULT_CHARS
     for i, source in enumerate(sources):
+        if budget <= 0:
+            break
         score = source.get("score", 0)
         content = source.get("content", "")
         src = source.get("source", "")
         title = source.get("title", "")
 
-        # Truncate long content
-        if len(content) > 2000:
-            content = content[:2000] + "...(truncated)"
-
-        citation = f"【ref_{i + 1}†relevance:{score:.2f}】"
-        header = f"## {title}\n" if title else ""
-        source_line = f"\n_Source: {src}_" if src else ""
-        formatted.append(f"{header}{citation}\n{content}{source_line}")
+        if i:
+            buf.write("\n\n---\n\n")
+        if title:
+            buf.write(f"## {title}\n")
+        buf.write(f"【ref_{i + 1}†relevance:{score:.2f}】\n")
+        # Truncate long content (per source and against the total budget)
+        take = min(len(content), _MAX_SOURCE_CHARS, budget)
+        buf.write(content[:take])
+        if take < len(content):
+            buf.write("...(truncated)")
+        budget -= take
+        if src:
+            buf.write(f"\n_Source: {src}_")
 
     # Add activity summary
     activity = result.get("activity", [])
@@ -266,7 +335,8 @@ def _format_results(result: dict) -> str:
 
     footer = f"\n\n---\n📊 {' | '.join(footer_parts)}"
 
-    return "\n\n---\n\n".join(formatted) + footer
+    buf.write(footer)
+    return buf.getvalue()
 
 
 # ========== Agent Tool Function ========== #
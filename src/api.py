@@ -7,12 +7,12 @@ Provides:
 - GET /api/health — Health check
 """
 
-import json
+import asyncio
 import logging
 import os
 import re
-import uuid
-from collections.abc import AsyncGenerator
+import secrets
+from collections.abc import AsyncGenerator, Collection
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -21,33 +21,41 @@ from src.telemetry import get_tracer, setup_telemetry
 
 setup_telemetry()
 
-from fastapi import FastAPI, Request  # noqa: E402
+import orjson  # noqa: E402
+from fastapi import FastAPI, Query, Request  # noqa: E402
 from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
-from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+from fastapi.responses import ORJSONResponse, StreamingResponse  # noqa: E402
 
 from src import __version__  # noqa: E402
 from src.agent import (
+    HISTORY_CONTEXT_MESSAGES,
     IMAGE_DATA_END,
     IMAGE_DATA_START,  # noqa: E402
+    REASONING_APPEND_END,
+    REASONING_APPEND_START,
     REASONING_END,
     REASONING_START,
+    TOOL_EVENT_END,
+    TOOL_EVENT_START,
     run_agent_stream,
 )
 from src.config import DEBUG  # noqa: E402
+from src.content_safety import aclose as close_safety_client  # noqa: E402
 from src.content_safety import (
     analyze_safety,  # noqa: E402
     check_prompt_shield,
     format_safety_summary,
 )
 from src.content_safety import is_configured as safety_configured  # noqa: E402
+from src.content_safety import prewarm as prewarm_safety_client  # noqa: E402
 from src.database import (
     delete_conversation,
     get_conversation,  # noqa: E402
     list_conversations,
+    list_conversations_page,
     save_conversation,
 )
 from src.models import ChatRequest  # noqa: E402
-from src.tools import generate_image, pop_pending_images  # noqa: E402
 
 # Configure logging
 logging.basicConfig(
@@ -73,8 +81,15 @@ async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("Vector Store initialization skipped: %s", e)
 
+    # Client setup and the first token fetch happen here, not on the first chat
+    await prewarm_safety_client()
+
     yield
-    # ---- shutdown ---- (nothing to clean up)
+    # ---- shutdown ----
+    from src.agentic_retrieval import aclose as close_retrieval_client
+
+    await close_retrieval_client()
+    await close_safety_client()
 
 
 # FastAPI app
@@ -83,6 +98,7 @@ app = FastAPI(
     description="AI-Powered Social Media Content Studio",
     version=__version__,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS — allow frontend dev and deployed origins
@@ -99,6 +115,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginated conversation lists return the next page token here
+    expose_headers=["X-Continuation-Token"],
 )
 
 
@@ -106,63 +124,199 @@ app.add_middleware(
 _STATIC_DIR = Path(__file__).resolve().parent.parent / "frontend" / "dist"
 _SERVE_STATIC = os.getenv("SERVE_STATIC", "false").lower() == "true"
 
-# Regex for reasoning, tool event, and image data markers
-TOOL_EVENT_PATTERN = re.compile(r"__TOOL_EVENT__(.*?)__END_TOOL_EVENT__")
-REASONING_PATTERN = re.compile(rf"{re.escape(REASONING_START)}([\s\S]*?){re.escape(REASONING_END)}")
-IMAGE_DATA_PATTERN = re.compile(rf"{re.escape(IMAGE_DATA_START)}([\s\S]*?){re.escape(IMAGE_DATA_END)}")
+# Regex for reasoning, tool event, and image data markers (whole-frame
+# matching; _split_stream_chunk scans with str.find instead). DOTALL "."
+# compiles to a single any-char opcode rather than a [\s\S] class check.
+TOOL_EVENT_PATTERN = re.compile(r"__TOOL_EVENT__(.*?)__END_TOOL_EVENT__", re.DOTALL)
+REASONING_PATTERN = re.compile(rf"{re.escape(REASONING_START)}(.*?){re.escape(REASONING_END)}", re.DOTALL)
+IMAGE_DATA_PATTERN = re.compile(rf"{re.escape(IMAGE_DATA_START)}(.*?){re.escape(IMAGE_DATA_END)}", re.DOTALL)
+
+# Platforms whose posts always carry a visual (image fallback targets)
+IMAGE_PLATFORMS = frozenset({"linkedin", "instagram"})
+_JSON_FENCE = "```json"
+
+# Text events are {"choices": [{"messages": [{"role": "assistant", "content": ...}]}],
+# "thread_id": ...}; only the content is serialized per chunk, the rest of
+# the envelope is fixed.
+_TEXT_EVENT_PREFIX = b'{"choices":[{"messages":[{"role":"assistant","content":'
+
+
+def _sse(event: dict) -> bytes:
+    """Serialize one SSE event as UTF-8 bytes (no ASCII escaping)."""
+    return orjson.dumps(event) + b"\n\n"
+
+
+# (start marker, end marker, segment kind) for frames emitted by run_agent_stream
+_STREAM_MARKERS = (
+    (TOOL_EVENT_START, TOOL_EVENT_END, "tool_event"),
+    (REASONING_START, REASONING_END, "reasoning"),
+    (REASONING_APPEND_START, REASONING_APPEND_END, "reasoning_delta"),
+    (IMAGE_DATA_START, IMAGE_DATA_END, "image"),
+)
+
+# Common prefix of every start marker above
+_MARKER_PREFIX = "__"
+
 
+def _split_stream_chunk(chunk: str) -> list[tuple[str, str]]:
+    """Split an agent stream chunk into ``(kind, payload)`` segments.
 
-def _extract_image_prompts(content: str) -> dict[str, str]:
+    A single chunk may carry several marker frames plus plain text, since
+    the agent joins everything produced by one update.  ``kind`` is
+    ``"text"`` for unmarked text; an unterminated marker is left as text.
+    """
+    # Every marker starts with "__"; most chunks are plain text tokens
+    if _MARKER_PREFIX not in chunk:
+        return [("text", chunk)] if chunk else []
+
+    segments: list[tuple[str, str]] = []
+    pos = 0
+    # Next offset of each start marker.  A marker is searched again only
+    # once pos has moved past its cached offset, so each one scans the
+    # chunk at most once and the split stays linear in the chunk length.
+    next_at = [chunk.find(start) for start, _, _ in _STREAM_MARKERS]
+    while True:
+        found = -1
+        marker = None
+        for i, (start, end, kind) in enumerate(_STREAM_MARKERS):
+            idx = next_at[i]
+            if idx != -1 and idx < pos:
+                idx = next_at[i] = chunk.find(start, pos)
+            if idx != -1 and (found == -1 or idx < found):
+                found, marker = idx, (start, end, kind)
+        if marker is None:
+            break
+        start, end, kind = marker
+        payload_start = found + len(start)
+        payload_end = chunk.find(end, payload_start)
+        if payload_end == -1:
+            break
+        if found > pos:
+            segments.append(("text", chunk[pos:found]))
+        segments.append((kind, chunk[payload_start:payload_end]))
+        pos = payload_end + len(end)
+    if pos < len(chunk):
+        segments.append(("text", chunk[pos:]))
+    return segments
+
+
+# Layout of the agent's IMAGE_DATA payload (orjson output of _image_frame)
+_IMAGE_PAYLOAD_HEAD = '{"platform":'
+_IMAGE_PAYLOAD_SEP = ',"image_base64":'
+
+
+def _image_event(payload: str) -> tuple[str, bytes] | None:
+    """Turn an IMAGE_DATA payload into ``(platform, SSE image event)``.
+
+    The base64 string is spliced through as-is instead of being decoded
+    and re-encoded (it needs no JSON escaping); payloads in any other
+    layout take the parse path.  Returns None if the payload is invalid.
+    """
+    sep = payload.find(_IMAGE_PAYLOAD_SEP)
+    b64_start = sep + len(_IMAGE_PAYLOAD_SEP)
+    if (
+        sep != -1
+        and payload.startswith(_IMAGE_PAYLOAD_HEAD)
+        and payload.endswith('"}')
+        and payload.startswith('"', b64_start)
+        and payload.count('"', b64_start) == 2
+        and payload.find("\\", b64_start) == -1
+    ):
+        try:
+            platform = orjson.loads(payload[len(_IMAGE_PAYLOAD_HEAD) : sep])
+        except orjson.JSONDecodeError:
+            platform = None
+        if isinstance(platform, str):
+            platform = platform.lower().strip()
+            head = b'{"type":"image","platform":' + orjson.dumps(platform) + _IMAGE_PAYLOAD_SEP.encode()
+            return platform, head + payload[b64_start:-1].encode() + b"}\n\n"
+
+    try:
+        image_data = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(image_data, dict):
+        return None
+    platform = str(image_data.get("platform", "")).lower().strip()
+    return platform, _sse({"type": "image", "platform": platform, "image_base64": image_data.get("image_base64", "")})
+
+
+def _extract_image_prompts(content: str, wanted: Collection[str] = IMAGE_PLATFORMS) -> dict[str, str]:
     """Extract platform -> image_prompt from assistant JSON output.
 
-    Supports both normal mode and A/B mode output structures.
+    Supports both normal mode and A/B mode output structures; the first
+    prompt found per platform wins. Only platforms in ``wanted`` are
+    collected, and scanning stops once each of them has a prompt.
     """
-    if not content:
+    if not content or not wanted:
         return {}
 
-    # Prefer fenced JSON, fallback to whole content
-    fence_match = re.search(r"```json\s*\n?([\s\S]*?)```", content)
-    json_str = fence_match.group(1).strip() if fence_match else content.strip()
+    # Prefer fenced JSON, fallback to whole content (surrounding whitespace
+    # is stripped either way, so two finds replace a lazy regex scan)
+    json_str = content
+    fence_start = content.find(_JSON_FENCE)
+    if fence_start >= 0:
+        body_start = fence_start + len(_JSON_FENCE)
+        fence_end = content.find("```", body_start)
+        if fence_end >= 0:
+            json_str = content[body_start:fence_end]
+    json_str = json_str.strip()
 
     if not json_str.startswith("{"):
         return {}
 
     try:
-        parsed = json.loads(json_str)
-    except Exception:
+        parsed = orjson.loads(json_str)
+    except orjson.JSONDecodeError:
         return {}
 
     prompts: dict[str, str] = {}
 
-    # Normal mode
-    if isinstance(parsed.get("contents"), list):
-        for item in parsed["contents"]:
-            if not isinstance(item, dict):
+    # Normal mode first, then A/B variants
+    for key in ("contents", "variant_a", "variant_b"):
+        contents = parsed.get(key)
+        if key != "contents":
+            try:
+                contents = contents["contents"]
+            except (KeyError, TypeError):
                 continue
-            platform = str(item.get("platform", "")).lower().strip()
-            prompt = str(item.get("image_prompt", "")).strip()
-            if platform and prompt:
-                prompts[platform] = prompt
-
-    # A/B mode (keep first available prompt per platform)
-    for variant_key in ("variant_a", "variant_b"):
-        variant = parsed.get(variant_key)
-        if not isinstance(variant, dict):
-            continue
-        contents = variant.get("contents")
         if not isinstance(contents, list):
             continue
         for item in contents:
-            if not isinstance(item, dict):
+            try:
+                platform = str(item["platform"]).lower().strip()
+                prompt = str(item["image_prompt"]).strip()
+            except (KeyError, TypeError):
                 continue
-            platform = str(item.get("platform", "")).lower().strip()
-            prompt = str(item.get("image_prompt", "")).strip()
-            if platform and prompt and platform not in prompts:
+            if platform in wanted and prompt and platform not in prompts:
                 prompts[platform] = prompt
+                if len(prompts) == len(wanted):
+                    return prompts
 
     return prompts
 
 
+async def _render_fallback_image(platform: str, prompt: str) -> tuple[str, str | None]:
+    """Render one fallback image, returning (platform, base64 or None).
+
+    Failures are logged and reported as None so one platform cannot
+    abort the others.
+    """
+    # Deferred: src.tools pulls in agent_framework and openai (the agent
+    # imports them lazily too), which would dominate the app's import time
+    from src.tools import render_image
+
+    try:
+        return platform, await render_image(prompt, platform)
+    except Exception as fallback_error:
+        logger.warning(
+            "Image fallback failed for platform=%s: %s",
+            platform,
+            fallback_error,
+        )
+        return platform, None
+
+
 @app.get("/api/health")
 async def health_check() -> dict:
     """Health check endpoint."""
@@ -179,9 +333,23 @@ async def health_check() -> dict:
 
 
 @app.get("/api/conversations")
-async def api_list_conversations() -> list[dict]:
-    """List all conversations."""
-    return list_conversations()
+async def api_list_conversations(
+    page_size: int | None = Query(None, ge=1, le=100),
+    continuation_token: str | None = None,
+):
+    """List conversations, most recent first.
+
+    Without page_size every conversation is returned. With it, one page is
+    returned and the next page's token, if any, is sent in X-Continuation-Token.
+    """
+    if page_size is None:
+        return list_conversations()
+    try:
+        items, next_token = list_conversations_page(page_size=page_size, continuation_token=continuation_token)
+    except ValueError:
+        return ORJSONResponse(content={"error": "Invalid continuation token"}, status_code=400)
+    headers = {"X-Continuation-Token": next_token} if next_token else None
+    return ORJSONResponse(content=items, headers=headers)
 
 
 @app.get("/api/conversations/{conversation_id}")
@@ -189,7 +357,7 @@ async def api_get_conversation(conversation_id: str):
     """Get a single conversation with messages."""
     convo = get_conversation(conversation_id)
     if convo is None:
-        return JSONResponse(content={"error": "Not found"}, status_code=404)
+        return ORJSONResponse(content={"error": "Not found"}, status_code=404)
     return convo
 
 
@@ -198,7 +366,7 @@ async def api_delete_conversation(conversation_id: str):
     """Delete a conversation."""
     if delete_conversation(conversation_id):
         return {"status": "deleted"}
-    return JSONResponse(content={"error": "Not found"}, status_code=404)
+    return ORJSONResponse(content={"error": "Not found"}, status_code=404)
 
 
 @app.post("/api/chat")
@@ -212,23 +380,23 @@ async def chat(request: Request) -> StreamingResponse:
     - Done/error signals
     """
     try:
-        body = await request.json()
-        chat_req = ChatRequest(**body)
+        # Pydantic parses and validates the raw JSON in one pass (no dict round-trip)
+        chat_req = ChatRequest.model_validate_json(await request.body())
     except Exception as e:
         logger.error("Invalid request: %s", e)
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": "Invalid request body"},
             status_code=400,
         )
 
     # Thread ID for multi-turn
-    thread_id = chat_req.thread_id or str(uuid.uuid4())
+    thread_id = chat_req.thread_id or secrets.token_hex(16)
 
     # ---- Prompt Shield: detect prompt injection attacks ----
     shield_result = await check_prompt_shield(chat_req.message)
     if not shield_result.get("safe", True) and shield_result.get("attack_detected"):
         logger.warning("Prompt shield blocked input (thread=%s)", thread_id)
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "error": "Your message was blocked by our safety system. "
                 "It appears to contain a prompt injection attempt.",
@@ -244,11 +412,14 @@ async def chat(request: Request) -> StreamingResponse:
     # Add user message to history
     history.append({"role": "user", "content": chat_req.message})
 
-    async def generate():
-        """SSE event generator."""
-        assistant_content = ""
+    async def generate() -> AsyncGenerator[bytes, None]:
+        """SSE event generator (UTF-8 bytes, so Starlette sends them as-is)."""
+        # Text segments of the response; joined once after the stream ends
+        content_parts: list[str] = []
         emitted_image_platforms: set[str] = set()
         _tracer = get_tracer()  # noqa: F841 — kept for future span creation
+        # Closing part of the text event envelope; constant for the request
+        text_event_suffix = b'}]}],"thread_id":' + orjson.dumps(thread_id) + b"}\n\n"
 
         try:
             async for chunk in run_agent_stream(
@@ -256,7 +427,9 @@ async def chat(request: Request) -> StreamingResponse:
                 platforms=chat_req.platforms,
                 content_type=chat_req.content_type,
                 language=chat_req.language,
-                history=history[:-1],  # Exclude current message (already in query)
+                # Only the recent turns the query uses; exclude the current
+                # message (already in query) without copying the whole history
+                history=history[-HISTORY_CONTEXT_MESSAGES - 1 : -1],
                 reasoning_effort=chat_req.reasoning_effort,
                 reasoning_summary=chat_req.reasoning_summary,
                 ab_mode=chat_req.ab_mode,
@@ -266,133 +439,119 @@ async def chat(request: Request) -> StreamingResponse:
                 if not chunk:
                     continue
 
-                chunk_str = str(chunk)
-
-                # Check for tool events
-                tool_match = TOOL_EVENT_PATTERN.search(chunk_str)
-                if tool_match:
-                    yield f"{chunk_str}\n\n"
-                    continue
-
-                # Check for image data markers — send as separate SSE event
-                image_match = IMAGE_DATA_PATTERN.search(chunk_str)
-                if image_match:
-                    try:
-                        image_data = json.loads(image_match.group(1))
-                        platform = str(image_data.get("platform", "")).lower().strip()
+                # One agent chunk may hold several frames; their SSE events
+                # are written together so the chunk costs a single send.
+                events: list[bytes] = []
+                for kind, payload in _split_stream_chunk(chunk):
+                    if kind == "tool_event":
+                        events.append(f"{TOOL_EVENT_START}{payload}{TOOL_EVENT_END}\n\n".encode())
+
+                    elif kind == "image":
+                        # Image data markers — send as separate SSE event
+                        image = _image_event(payload)
+                        if image is None:
+                            logger.warning("Failed to parse image data marker")
+                            continue
+                        platform, image_event = image
                         if platform:
                             emitted_image_platforms.add(platform)
-                        image_event = {
-                            "type": "image",
-                            "platform": platform,
-                            "image_base64": image_data.get("image_base64", ""),
+                        events.append(image_event)
+
+                    elif kind in ("reasoning", "reasoning_delta"):
+                        # Encode as JSON to avoid \n\n in reasoning text
+                        # breaking SSE framing.  reasoning_update replaces
+                        # the client's text; reasoning_delta appends to it.
+                        reasoning_event = {
+                            "type": "reasoning_update" if kind == "reasoning" else "reasoning_delta",
+                            "reasoning": payload,
                         }
-                        yield json.dumps(image_event, ensure_ascii=False) + "\n\n"
-                    except json.JSONDecodeError:
-                        logger.warning("Failed to parse image data marker")
-                    continue
-
-                # Check for reasoning markers — encode as JSON to avoid
-                # \n\n in reasoning text breaking SSE framing
-                reasoning_match = REASONING_PATTERN.search(chunk_str)
-                if reasoning_match:
-                    reasoning_text = reasoning_match.group(1)
-                    reasoning_event = {
-                        "type": "reasoning_update",
-                        "reasoning": reasoning_text,
-                    }
-                    yield json.dumps(reasoning_event, ensure_ascii=False) + "\n\n"
-                    continue
-
-                # Regular text — accumulate and send as response chunk
-                clean_chunk = REASONING_PATTERN.sub("", chunk_str)
-                clean_chunk = TOOL_EVENT_PATTERN.sub("", clean_chunk)
-
-                if clean_chunk.strip():
-                    assistant_content += clean_chunk
-                    response = {
-                        "choices": [
-                            {
-                                "messages": [
-                                    {
-                                        "role": "assistant",
-                                        "content": clean_chunk,
-                                    }
-                                ]
-                            }
-                        ],
-                        "thread_id": thread_id,
-                    }
-                    yield json.dumps(response, ensure_ascii=False) + "\n\n"
-
-            # Save assistant response to history
-            if assistant_content:
-                history.append({"role": "assistant", "content": assistant_content})
-
-                # Persist to Cosmos DB (or in-memory fallback)
-                title = chat_req.message[:50].rstrip()
-                save_conversation(
-                    conversation_id=thread_id,
-                    title=title,
-                    messages=history,
-                )
-
-            # ---- Image fallback: generate missing visuals from image_prompt ----
-            required_image_platforms = {
-                p.lower().strip() for p in (chat_req.platforms or []) if p.lower().strip() in {"linkedin", "instagram"}
-            }
-            missing_platforms = required_image_platforms - emitted_image_platforms
-
-            if assistant_content and missing_platforms:
-                image_prompts = _extract_image_prompts(assistant_content)
-                for platform in sorted(missing_platforms):
-                    prompt = image_prompts.get(platform, "")
-                    if not prompt:
-                        continue
+                        events.append(_sse(reasoning_event))
+
+                    elif payload.strip():
+                        # Regular text — accumulate and send as response chunk
+                        content_parts.append(payload)
+                        events.append(_TEXT_EVENT_PREFIX + orjson.dumps(payload) + text_event_suffix)
+
+                if events:
+                    yield b"".join(events)
+
+            assistant_content = "".join(content_parts)
+
+            # Content Safety runs while the conversation is saved and image
+            # fallbacks are generated; its result is awaited just before use
+            safety_task = asyncio.create_task(analyze_safety(assistant_content)) if assistant_content else None
+            try:
+                # Save assistant response to history
+                if assistant_content:
+                    history.append({"role": "assistant", "content": assistant_content})
+
+                    # Persist to Cosmos DB (or in-memory fallback)
+                    title = chat_req.message[:50].rstrip()
+                    # Off the event loop, so the safety check progresses meanwhile
+                    await asyncio.to_thread(
+                        save_conversation,
+                        conversation_id=thread_id,
+                        title=title,
+                        messages=history,
+                    )
+
+                # ---- Image fallback: generate missing visuals from image_prompt ----
+                required_image_platforms = {p.lower().strip() for p in (chat_req.platforms or [])} & IMAGE_PLATFORMS
+                missing_platforms = required_image_platforms - emitted_image_platforms
+
+                if assistant_content and missing_platforms:
+                    image_prompts = _extract_image_prompts(assistant_content, missing_platforms)
+                    # One render per platform, emitted in completion order
+                    fallback_tasks = [
+                        asyncio.create_task(_render_fallback_image(platform, image_prompts[platform]))
+                        for platform in sorted(missing_platforms)
+                        if image_prompts.get(platform)
+                    ]
                     try:
-                        # Run the same tool used by the agent as a fallback path
-                        await generate_image(prompt=prompt, platform=platform)
-                        generated_images = pop_pending_images()
-                        image_b64 = generated_images.get(platform, "")
-                        if image_b64:
-                            emitted_image_platforms.add(platform)
-                            fallback_event = {
-                                "type": "image",
-                                "platform": platform,
-                                "image_base64": image_b64,
-                            }
-                            yield json.dumps(fallback_event, ensure_ascii=False) + "\n\n"
-                            logger.info("Image fallback generated for platform=%s", platform)
-                    except Exception as fallback_error:
-                        logger.warning(
-                            "Image fallback failed for platform=%s: %s",
-                            platform,
-                            fallback_error,
-                        )
-
-            # ---- Content Safety: analyze generated output ----
-            safety_result = (
-                await analyze_safety(assistant_content)
-                if assistant_content
-                else {"safe": True, "skipped": True, "reason": "No content generated"}
-            )
-            safety_event = {
-                "type": "safety",
-                "safety": safety_result,
-                "summary": format_safety_summary(safety_result),
-            }
-            yield json.dumps(safety_event, ensure_ascii=False) + "\n\n"
-
-            if not safety_result.get("safe", True):
-                logger.warning(
-                    "Content Safety flagged output (thread=%s): %s",
-                    thread_id,
-                    format_safety_summary(safety_result),
+                        for next_done in asyncio.as_completed(fallback_tasks):
+                            platform, image_b64 = await next_done
+                            if image_b64:
+                                emitted_image_platforms.add(platform)
+                                fallback_event = {
+                                    "type": "image",
+                                    "platform": platform,
+                                    "image_base64": image_b64,
+                                }
+                                yield _sse(fallback_event)
+                                logger.info("Image fallback generated for platform=%s", platform)
+                    finally:
+                        # Client disconnects must not leave renders running
+                        for task in fallback_tasks:
+                            task.cancel()
+
+                # ---- Content Safety: analyze generated output ----
+                safety_result = (
+                    await safety_task
+                    if safety_task is not None
+                    else {"safe": True, "skipped": True, "reason": "No content generated"}
                 )
-
-            # Send done signal
-            done_event = {"type": "done", "thread_id": thread_id}
-            yield json.dumps(done_event) + "\n\n"
+                safety_summary = format_safety_summary(safety_result)
+                safety_event = {
+                    "type": "safety",
+                    "safety": safety_result,
+                    "summary": safety_summary,
+                }
+                yield _sse(safety_event)
+
+                if not safety_result.get("safe", True):
+                    logger.warning(
+                        "Content Safety flagged output (thread=%s): %s",
+                        thread_id,
+                        safety_summary,
+                    )
+
+                # Send done signal
+                done_event = {"type": "done", "thread_id": thread_id}
+                yield _sse(done_event)
+            finally:
+                # Disconnects and failed saves must not orphan the check
+                if safety_task is not None and not safety_task.done():
+                    safety_task.cancel()
 
         except Exception as e:
             logger.error("Stream error: %s", e, exc_info=True)
@@ -409,7 +568,7 @@ async def chat(request: Request) -> StreamingResponse:
                     " / An error occurred during content generation. Please try again."
                 )
             error_event = {"error": user_message}
-            yield json.dumps(error_event, ensure_ascii=False) + "\n\n"
+            yield _sse(error_event)
 
     return StreamingResponse(
         generate(),
@@ -424,17 +583,24 @@ async def chat(request: Request) -> StreamingResponse:
 # ---------- Mount frontend static files (production) ---------- #
 if _SERVE_STATIC and _STATIC_DIR.is_dir():
     from fastapi.responses import FileResponse
+    from fastapi.staticfiles import StaticFiles
+
+    _STATIC_ROOT = _STATIC_DIR.resolve()
+    _INDEX_HTML = _STATIC_ROOT / "index.html"
+
+    # Hashed build assets are served by StaticFiles (ETag/Last-Modified, 304s)
+    if (_STATIC_ROOT / "assets").is_dir():
+        app.mount("/assets", StaticFiles(directory=_STATIC_ROOT / "assets"), name="assets")
 
     @app.get("/{full_path:path}")
     async def serve_spa(full_path: str) -> FileResponse:
-        """Serve SPA — return index.html for all non-API routes."""
-        file_path = (_STATIC_DIR / full_path).resolve()
-        # Prevent path traversal — ensure resolved path is under _STATIC_DIR
-        if not str(file_path).startswith(str(_STATIC_DIR.resolve())):
-            return FileResponse(_STATIC_DIR / "index.html")
-        if file_path.is_file():
+        """Serve SPA — top-level files as-is, index.html for all other non-API routes."""
+        file_path = (_STATIC_ROOT / full_path).resolve()
+        # Prevent path traversal — the resolved path must stay under the static root
+        # (a string prefix check would also accept sibling dirs like dist-old/)
+        if file_path.is_relative_to(_STATIC_ROOT) and file_path.is_file():
             return FileResponse(file_path)
-        return FileResponse(_STATIC_DIR / "index.html")
+        return FileResponse(_INDEX_HTML)
 
     logger.info("Serving frontend static files from %s", _STATIC_DIR)
 
@@ -450,18 +616,18 @@ async def safety_check_endpoint(request: Request):
     Returns: {safe, categories, blocked_categories?, summary}
     """
     try:
-        body = await request.json()
-    except Exception:
-        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        return ORJSONResponse({"error": "Invalid JSON"}, status_code=400)
 
     text = body.get("text", "")
     check_injection = body.get("check_prompt_injection", False)
 
     if not text:
-        return JSONResponse({"error": "text is required"}, status_code=400)
+        return ORJSONResponse({"error": "text is required"}, status_code=400)
 
     if not safety_configured():
-        return JSONResponse(
+        return ORJSONResponse(
             {
                 "error": "Content Safety not configured",
                 "hint": "Set CONTENT_SAFETY_ENDPOINT environment variable",
@@ -491,21 +657,21 @@ async def evaluate_content_endpoint(request: Request):
     Returns: {relevance, coherence, fluency, groundedness?, ...}
     """
     try:
-        body = await request.json()
-    except Exception:
-        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        return ORJSONResponse({"error": "Invalid JSON"}, status_code=400)
 
     query = body.get("query", "")
     response_text = body.get("response", "")
     context = body.get("context")
 
     if not query or not response_text:
-        return JSONResponse({"error": "query and response are required"}, status_code=400)
+        return ORJSONResponse({"error": "query and response are required"}, status_code=400)
 
     from src.evaluation import evaluate_content, is_configured
 
     if not is_configured():
-        return JSONResponse(
+        return ORJSONResponse(
             {
                 "error": "Evaluation not configured",
                 "hint": "Install azure-ai-evaluation: uv add azure-ai-evaluation",
@@ -515,7 +681,7 @@ async def evaluate_content_endpoint(request: Request):
 
     scores = await evaluate_content(query=query, response=response_text, context=context)
     if "error" in scores:
-        return JSONResponse({"error": scores["error"]}, status_code=500)
+        return ORJSONResponse({"error": scores["error"]}, status_code=500)
     return scores
 
 
@@ -531,6 +697,10 @@ def main() -> None:
         host=HOST,
         port=PORT,
         reload=DEBUG,
+        # The default loop/http "auto" picks uvloop and httptools from
+        # uvicorn[standard] where available, falling back to asyncio/h11
+        timeout_keep_alive=75,
+        backlog=2048,
     )
 
 
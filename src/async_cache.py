@@ -0,0 +1,89 @@
+"""Async TTL cache whose concurrent misses share one fetch.
+
+Bounded LRU with a per-entry TTL, used for Content Safety verdicts and
+Foundry IQ retrievals. A miss starts one fetch task that every concurrent
+caller for the same key awaits. Only touched from the event loop with no
+awaits in between, so no lock.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """Bounded LRU cache with a TTL and single-flight misses.
+
+    Values rejected by ``cacheable``, and fetches that fail or are cancelled,
+    reach the callers waiting on them but are not stored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_s: float,
+        max_entries: int,
+        cacheable: Callable[[V], bool] | None = None,
+    ) -> None:
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._cacheable = cacheable
+        # key → (monotonic expiry, value); oldest first
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value for key, or None if missing/expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get_or_fetch(self, key: K, fetch: Callable[[], Awaitable[V]]) -> V:
+        """Return the cached value, or run ``fetch`` once for all concurrent callers."""
+        value = self.get(key)
+        if value is not None:
+            logger.debug("%s cache hit", self.name)
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_fetched(key, t))
+        # shield: a cancelled caller must not cancel the fetch other callers share
+        return await asyncio.shield(task)
+
+    def _on_fetched(self, key: K, task: asyncio.Future[V]) -> None:
+        """Store a finished fetch, unless it failed or is not cacheable."""
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if self._cacheable is not None and not self._cacheable(value):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached values (fetches in progress are unaffected)."""
+        self._entries.clear()
@@ -9,7 +9,9 @@ input items, which the current agent-framework-core SDK omits.
 
 # pylint: disable=no-name-in-module
 
+import asyncio
 import logging
+import time
 from functools import lru_cache
 from typing import Any
 
@@ -25,6 +27,16 @@ logger = logging.getLogger(__name__)
 # Shared credential (singleton)
 _credential = DefaultAzureCredential()
 
+
+def get_credential() -> DefaultAzureCredential:
+    """Return the process-wide DefaultAzureCredential.
+
+    Sharing one instance means the credential chain is probed once and
+    tokens are cached in one place.
+    """
+    return _credential
+
+
 # ---------------------------------------------------------------------------
 # Monkey-patch: add type="message" to each message item for Responses API
 # The Microsoft Foundry Responses API requires each input item to have
@@ -42,24 +54,37 @@ def _patched_prepare_message(
     """Wrap the original method to add ``type`` to message items."""
     items = _original_prepare_message(self, message, call_id_to_id)
     for item in items:
-        if "type" not in item and "role" in item:
-            item["type"] = "message"
+        if "role" in item:
+            item.setdefault("type", "message")
     return items
 
 
 setattr(RawOpenAIResponsesClient, "_prepare_message_for_openai", _patched_prepare_message)
 
 
-async def _get_token() -> str:
-    """Async token provider for Azure AD authentication.
+# Bearer tokens per scope, reused until shortly before expiry
+_TOKEN_REFRESH_MARGIN_S = 300
+_tokens: dict[str, Any] = {}  # scope → azure.core.credentials.AccessToken
 
-    Returns a fresh token each time, letting DefaultAzureCredential
-    handle caching and refresh internally.
+
+async def get_token(scope: str) -> str:
+    """Return a bearer token for scope from the shared credential.
+
+    The token is cached until ``_TOKEN_REFRESH_MARGIN_S`` before expiry and
+    refreshed off the event loop, since get_token() is blocking I/O.
     """
-    token = _credential.get_token(AZURE_AI_SCOPE)
+    token = _tokens.get(scope)
+    if token is None or token.expires_on - time.time() <= _TOKEN_REFRESH_MARGIN_S:
+        token = await asyncio.to_thread(_credential.get_token, scope)
+        _tokens[scope] = token
     return token.token
 
 
+async def _get_token() -> str:
+    """Async token provider for Azure AD authentication."""
+    return await get_token(AZURE_AI_SCOPE)
+
+
 @lru_cache(maxsize=1)
 def get_client() -> AzureOpenAIResponsesClient:
     """Return a singleton AzureOpenAIResponsesClient.
@@ -65,6 +65,15 @@ EVAL_TOKEN_SCOPE: str = os.getenv("EVAL_TOKEN_SCOPE", "https://cognitiveservices
 # Content Safety
 CONTENT_SAFETY_ENDPOINT: str = os.getenv("CONTENT_SAFETY_ENDPOINT", "")
 
+# Response cache for single-turn requests (0 disables)
+RESPONSE_CACHE_TTL_S: int = int(os.getenv("RESPONSE_CACHE_TTL_S", "0"))
+RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "64"))
+
+# Cosmos conversation cache (0 disables). Writes from other replicas are not
+# seen until the entry expires, so enable only with one replica or affinity.
+CONVERSATION_CACHE_TTL_S: int = int(os.getenv("CONVERSATION_CACHE_TTL_S", "0"))
+CONVERSATION_CACHE_MAX_ENTRIES: int = int(os.getenv("CONVERSATION_CACHE_MAX_ENTRIES", "1024"))
+
 # Feature flags
 DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
 SERVE_STATIC: bool = os.getenv("SERVE_STATIC", "false").lower() == "true"
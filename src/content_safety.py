@@ -20,14 +20,48 @@ Usage:
     # → {"safe": True, "attack_detected": False}
 """
 
+import hashlib
 import logging
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
 from typing import Any
 
+from src.async_cache import AsyncTTLCache
+
 logger = logging.getLogger(__name__)
 
 # Lazy imports for optional dependency
 _client = None
+_credential = None
 _configured: bool | None = None
+_CONTENT_SAFETY_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+# Verdict cache: repeated texts (canned prompts, replayed responses) reuse
+# the previous verdict for the TTL, and concurrent checks of the same text
+# share one request.  Failed (fail-closed, "skipped") checks are not cached.
+_VERDICT_CACHE_TTL_S = 600.0
+_VERDICT_CACHE_MAX_ENTRIES = 2048
+_verdict_cache: AsyncTTLCache[tuple[str, bytes], dict[str, Any]] = AsyncTTLCache(
+    "Content Safety",
+    _VERDICT_CACHE_TTL_S,
+    _VERDICT_CACHE_MAX_ENTRIES,
+    cacheable=lambda verdict: not verdict.get("skipped"),
+)
+
+
+def _verdict_key(kind: str, text: str) -> tuple[str, bytes]:
+    return kind, hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+async def _shared_verdict(
+    key: tuple[str, bytes],
+    fetch: Callable[[], Awaitable[dict[str, Any]]],
+) -> dict[str, Any]:
+    """Return a cached verdict, or run ``fetch`` once for all concurrent callers.
+
+    Each caller gets its own copy, since callers add keys to the result.
+    """
+    return dict(await _verdict_cache.get_or_fetch(key, fetch))
 
 
 def is_configured() -> bool:
@@ -53,23 +87,67 @@ def is_configured() -> bool:
 
 def _get_client():
     """Get or create Content Safety client (singleton)."""
-    global _client
+    global _client, _credential
     if _client is not None:
         return _client
 
-    from azure.ai.contentsafety import ContentSafetyClient
-    from azure.identity import DefaultAzureCredential
+    from azure.ai.contentsafety.aio import ContentSafetyClient
+    from azure.identity.aio import DefaultAzureCredential
 
     from src.config import CONTENT_SAFETY_ENDPOINT
 
+    _credential = DefaultAzureCredential()
     _client = ContentSafetyClient(
         endpoint=CONTENT_SAFETY_ENDPOINT,
-        credential=DefaultAzureCredential(),
+        credential=_credential,
+        credential_scopes=[_CONTENT_SAFETY_SCOPE],
     )
     logger.info("Content Safety client initialized: %s", CONTENT_SAFETY_ENDPOINT)
     return _client
 
 
+async def prewarm() -> None:
+    """Create the client and fetch its first token ahead of the first check.
+
+    DefaultAzureCredential remembers which credential in its chain
+    succeeded, and managed identity caches the token, so the first request
+    skips both.  Failures are logged and the lazy path takes over.
+    """
+    if not is_configured():
+        return
+    try:
+        _get_client()
+        await _credential.get_token(_CONTENT_SAFETY_SCOPE)
+        logger.info("Content Safety client warmed up")
+    except Exception as e:
+        logger.warning("Content Safety warm-up skipped: %s", e)
+
+
+async def aclose() -> None:
+    """Close the client and its credential (called on application shutdown)."""
+    global _client, _credential
+    if _client is not None:
+        await _client.close()
+        _client = None
+    if _credential is not None:
+        await _credential.close()
+        _credential = None
+
+
+@lru_cache(maxsize=1)
+def _analysis_models() -> tuple[type, list]:
+    """Import the text-analysis models once and build the category list."""
+    from azure.ai.contentsafety.models import AnalyzeTextOptions, TextCategory
+
+    categories = [
+        TextCategory.HATE,
+        TextCategory.SELF_HARM,
+        TextCategory.SEXUAL,
+        TextCategory.VIOLENCE,
+    ]
+    return AnalyzeTextOptions, categories
+
+
 async def analyze_safety(text: str) -> dict[str, Any]:
     """Analyze text for harmful content using Azure AI Content Safety.
 
@@ -94,25 +172,21 @@ async def analyze_safety(text: str) -> dict[str, Any]:
             "reason": "Content Safety not configured",
         }
 
-    try:
-        from azure.ai.contentsafety.models import AnalyzeTextOptions, TextCategory
+    # Truncate to API limit (10K characters per request); a slice covering
+    # the whole string returns it as-is, so short texts are not copied
+    truncated = text[:10000]
+    return await _shared_verdict(_verdict_key("text", truncated), lambda: _analyze_uncached(truncated))
 
+
+async def _analyze_uncached(truncated: str) -> dict[str, Any]:
+    """Call the Content Safety text analysis API (no caching)."""
+    try:
+        AnalyzeTextOptions, categories = _analysis_models()
         client = _get_client()
 
-        # Truncate to API limit (10K characters per request)
-        truncated = text[:10000] if len(text) > 10000 else text
-
-        request = AnalyzeTextOptions(
-            text=truncated,
-            categories=[
-                TextCategory.HATE,
-                TextCategory.SELF_HARM,
-                TextCategory.SEXUAL,
-                TextCategory.VIOLENCE,
-            ],
-        )
+        request = AnalyzeTextOptions(text=truncated, categories=categories)
 
-        response = client.analyze_text(request)
+        response = await client.analyze_text(request)
 
         categories = {}
         blocked = []
@@ -180,6 +254,11 @@ async def check_prompt_shield(
             "reason": "Content Safety not configured",
         }
 
+    return await _shared_verdict(_verdict_key("shield", user_input), lambda: _shield_uncached(user_input))
+
+
+async def _shield_uncached(user_input: str) -> dict[str, Any]:
+    """Call the Prompt Shield API (no caching)."""
     try:
         from azure.ai.contentsafety.models import ShieldPromptOptions, TextContent
 
@@ -190,7 +269,7 @@ async def check_prompt_shield(
             user_prompt_content=documents,
         )
 
-        response = client.shield_prompt(options)
+        response = await client.shield_prompt(options)
 
         # Check if attack was detected in user prompt
         user_attack = False
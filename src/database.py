@@ -5,13 +5,25 @@ Falls back to in-memory storage when Cosmos DB is not configured.
 """
 
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Any
 
-from src.config import COSMOS_CONTAINER, COSMOS_DATABASE, COSMOS_ENDPOINT
+from src.config import (
+    CONVERSATION_CACHE_MAX_ENTRIES,
+    CONVERSATION_CACHE_TTL_S,
+    COSMOS_CONTAINER,
+    COSMOS_DATABASE,
+    COSMOS_ENDPOINT,
+)
 
 logger = logging.getLogger(__name__)
 
+# HTTP connections kept warm per Cosmos host (requests' default is 10)
+_COSMOS_POOL_MAXSIZE = 64
+
 # Lazy-init Cosmos client
 _STATE: dict[str, Any] = {
     "cosmos_client": None,
@@ -20,23 +32,56 @@ _STATE: dict[str, Any] = {
 }
 
 
+# Saves run in worker threads (asyncio.to_thread) while reads run on the
+# event loop: compound updates of the module state below hold this lock.
+_lock = threading.RLock()
+
+
 def _get_container():
     """Get or create Cosmos DB container client (lazy init)."""
     if _STATE["initialized"]:
         return _STATE["container"]
 
-    _STATE["initialized"] = True
+    with _lock:
+        if _STATE["initialized"]:
+            return _STATE["container"]
+        container = _init_container()
+        _STATE["initialized"] = True
+        return container
 
+
+def _init_container():
+    """Create the Cosmos DB container client, or None for in-memory mode."""
     if not COSMOS_ENDPOINT:
         logger.info("COSMOS_ENDPOINT not set — using in-memory history")
         return None
 
     try:
+        import requests
+        from azure.core.pipeline.transport import RequestsTransport
         from azure.cosmos import CosmosClient
         from azure.identity import DefaultAzureCredential
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Shared session with a larger connection pool so concurrent reads
+        # and writes reuse warm TLS connections. urllib3 retries stay off:
+        # the Cosmos SDK's own retry policy already honors 429 retry-after.
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=_COSMOS_POOL_MAXSIZE,
+            pool_maxsize=_COSMOS_POOL_MAXSIZE,
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
 
         credential = DefaultAzureCredential()
-        _STATE["cosmos_client"] = CosmosClient(COSMOS_ENDPOINT, credential=credential)
+        _STATE["cosmos_client"] = CosmosClient(
+            COSMOS_ENDPOINT,
+            credential=credential,
+            transport=RequestsTransport(session=session),
+        )
 
         # Use existing database and container (provisioned via IaC / Azure CLI).
         # get_*_client() creates a local reference without a network call,
@@ -61,35 +106,89 @@ def _get_container():
         return None
 
 
-# In-memory fallback
-_memory_store: dict[str, dict[str, Any]] = {}
+# In-memory fallback, bounded: the least recently saved conversations are
+# evicted past the limit.
+_MEMORY_STORE_MAX_ENTRIES = 1000
+_memory_store: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+
+def _memory_put(conversation_id: str, doc: dict[str, Any]) -> None:
+    """Store a document in memory, evicting the least recently saved ones."""
+    with _lock:
+        _memory_store[conversation_id] = doc
+        _memory_store.move_to_end(conversation_id)
+        while len(_memory_store) > _MEMORY_STORE_MAX_ENTRIES:
+            _memory_store.popitem(last=False)
+
+
+# Cosmos read/write-through cache: (user_id, conversation_id) → (monotonic
+# expiry, document); oldest first. Disabled unless CONVERSATION_CACHE_TTL_S > 0.
+_doc_cache: OrderedDict[tuple[str, str], tuple[float, dict[str, Any]]] = OrderedDict()
+
+
+def _cache_get(key: tuple[str, str]) -> dict[str, Any] | None:
+    """Return a copy of a cached document, or None if missing/expired."""
+    with _lock:
+        entry = _doc_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, doc = entry
+        if time.monotonic() >= expires_at:
+            del _doc_cache[key]
+            return None
+        _doc_cache.move_to_end(key)
+    # Callers append to the messages list; keep the cached one untouched
+    return {**doc, "messages": list(doc.get("messages", []))}
+
+
+def _cache_put(key: tuple[str, str], doc: dict[str, Any]) -> None:
+    """Cache a document, evicting the least recently used entries."""
+    if CONVERSATION_CACHE_TTL_S <= 0 or CONVERSATION_CACHE_MAX_ENTRIES <= 0:
+        return
+    entry = (time.monotonic() + CONVERSATION_CACHE_TTL_S, {**doc, "messages": list(doc.get("messages", []))})
+    with _lock:
+        _doc_cache[key] = entry
+        _doc_cache.move_to_end(key)
+        while len(_doc_cache) > CONVERSATION_CACHE_MAX_ENTRIES:
+            _doc_cache.popitem(last=False)
+
+
+def _cache_drop(key: tuple[str, str]) -> None:
+    """Remove a document from the cache, if present."""
+    with _lock:
+        _doc_cache.pop(key, None)
 
 
 def snapshot_database_state_for_tests() -> dict[str, Any]:
     """Return a snapshot of module state for tests."""
-    return {
-        "memory_store": _memory_store.copy(),
-        "initialized": _STATE["initialized"],
-        "container": _STATE["container"],
-        "cosmos_client": _STATE["cosmos_client"],
-    }
+    with _lock:
+        return {
+            "memory_store": _memory_store.copy(),
+            "initialized": _STATE["initialized"],
+            "container": _STATE["container"],
+            "cosmos_client": _STATE["cosmos_client"],
+        }
 
 
 def force_in_memory_mode_for_tests() -> None:
     """Force in-memory mode for deterministic unit tests."""
-    _STATE["initialized"] = True
-    _STATE["container"] = None
-    _STATE["cosmos_client"] = None
-    _memory_store.clear()
+    with _lock:
+        _STATE["initialized"] = True
+        _STATE["container"] = None
+        _STATE["cosmos_client"] = None
+        _memory_store.clear()
+        _doc_cache.clear()
 
 
 def restore_database_state_for_tests(snapshot: dict[str, Any]) -> None:
     """Restore module state from a snapshot created by tests."""
-    _memory_store.clear()
-    _memory_store.update(snapshot.get("memory_store", {}))
-    _STATE["initialized"] = snapshot.get("initialized", False)
-    _STATE["container"] = snapshot.get("container")
-    _STATE["cosmos_client"] = snapshot.get("cosmos_client")
+    with _lock:
+        _memory_store.clear()
+        _memory_store.update(snapshot.get("memory_store", {}))
+        _doc_cache.clear()
+        _STATE["initialized"] = snapshot.get("initialized", False)
+        _STATE["container"] = snapshot.get("container")
+        _STATE["cosmos_client"] = snapshot.get("cosmos_client")
 
 
 def save_conversation(
@@ -108,32 +207,73 @@ def save_conversation(
         "title": title,
         "messages": messages,
         "updatedAt": now,
-        "createdAt": now,  # Cosmos upsert preserves existing createdAt via partial update
+        "createdAt": now,
     }
 
     if container is not None:
         try:
-            from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceNotFoundError
+            from azure.cosmos.exceptions import (
+                CosmosHttpResponseError,
+                CosmosResourceExistsError,
+                CosmosResourceNotFoundError,
+            )
 
-            # Try to preserve existing createdAt
+            # One round trip: patch the mutable fields in place, which leaves
+            # createdAt untouched; only a new conversation needs a create.
+            patch_ops = [
+                {"op": "set", "path": "/updatedAt", "value": now},
+                {"op": "set", "path": "/title", "value": title},
+                {"op": "set", "path": "/messages", "value": messages},
+            ]
             try:
-                existing = container.read_item(item=conversation_id, partition_key=user_id)
-                doc["createdAt"] = existing.get("createdAt", now)
+                saved = container.patch_item(item=conversation_id, partition_key=user_id, patch_operations=patch_ops)
             except CosmosResourceNotFoundError:
-                pass  # New document — use current time
-
-            container.upsert_item(doc)
+                try:
+                    saved = container.create_item(doc)
+                except CosmosResourceExistsError:
+                    # A concurrent save created it first: apply ours on top
+                    saved = container.patch_item(
+                        item=conversation_id, partition_key=user_id, patch_operations=patch_ops
+                    )
+            _cache_put((user_id, conversation_id), saved)
             logger.debug("Saved conversation %s to Cosmos DB", conversation_id)
         except CosmosHttpResponseError as e:
             logger.error("Failed to save to Cosmos DB: %s", e)
+            _cache_drop((user_id, conversation_id))
             # Fallback to memory
-            _memory_store[conversation_id] = doc
+            _memory_put(conversation_id, doc)
     else:
-        if conversation_id not in _memory_store:
-            doc["createdAt"] = now
-        else:
-            doc["createdAt"] = _memory_store[conversation_id].get("createdAt", now)
-        _memory_store[conversation_id] = doc
+        with _lock:
+            existing = _memory_store.get(conversation_id)
+            if existing is not None:
+                doc["createdAt"] = existing.get("createdAt", now)
+            _memory_put(conversation_id, doc)
+
+
+# Conversation summaries for a user's history sidebar, newest first
+_LIST_QUERY = "SELECT c.id, c.title, c.createdAt, c.updatedAt FROM c WHERE c.userId = @userId ORDER BY c.updatedAt DESC"
+
+
+def _memory_documents() -> list[dict[str, Any]]:
+    """Return a snapshot of the in-memory documents."""
+    with _lock:
+        return list(_memory_store.values())
+
+
+def _memory_summaries(user_id: str) -> list[dict]:
+    """Return in-memory conversation summaries for a user, newest first."""
+    convos = [
+        {
+            "id": v["id"],
+            "title": v["title"],
+            "createdAt": v.get("createdAt", ""),
+            "updatedAt": v.get("updatedAt", ""),
+        }
+        for v in _memory_documents()
+        if v.get("userId", "anonymous") == user_id
+    ]
+    convos.sort(key=lambda x: x.get("updatedAt", ""), reverse=True)
+    return convos
 
 
 def list_conversations(user_id: str = "anonymous") -> list[dict]:
@@ -144,14 +284,9 @@ def list_conversations(user_id: str = "anonymous") -> list[dict]:
         try:
             from azure.cosmos.exceptions import CosmosHttpResponseError
 
-            query = (
-                "SELECT c.id, c.title, c.createdAt, c.updatedAt "
-                "FROM c WHERE c.userId = @userId "
-                "ORDER BY c.updatedAt DESC"
-            )
             items = list(
                 container.query_items(
-                    query=query,
+                    query=_LIST_QUERY,
                     parameters=[{"name": "@userId", "value": user_id}],
                     enable_cross_partition_query=False,
                 )
@@ -162,18 +297,47 @@ def list_conversations(user_id: str = "anonymous") -> list[dict]:
             return []
     else:
         # In-memory fallback
-        convos = [
-            {
-                "id": v["id"],
-                "title": v["title"],
-                "createdAt": v.get("createdAt", ""),
-                "updatedAt": v.get("updatedAt", ""),
-            }
-            for v in _memory_store.values()
-            if v.get("userId", "anonymous") == user_id
-        ]
-        convos.sort(key=lambda x: x.get("updatedAt", ""), reverse=True)
-        return convos
+        return _memory_summaries(user_id)
+
+
+def list_conversations_page(
+    user_id: str = "anonymous",
+    page_size: int = 50,
+    continuation_token: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """List one page of a user's conversations, most recent first.
+
+    Returns the page and the token for the next one (None on the last page).
+    Raises ValueError for a continuation token the backend rejects.
+    """
+    container = _get_container()
+
+    if container is not None:
+        try:
+            from azure.cosmos.exceptions import CosmosHttpResponseError
+
+            pager = container.query_items(
+                query=_LIST_QUERY,
+                parameters=[{"name": "@userId", "value": user_id}],
+                enable_cross_partition_query=False,
+                max_item_count=page_size,
+            ).by_page(continuation_token)
+            items = list(next(pager, []))
+            return items, pager.continuation_token
+        except CosmosHttpResponseError as e:
+            if e.status_code == 400:
+                # Malformed or stale token: a client error, not an empty page
+                raise ValueError(f"Invalid continuation token: {continuation_token}") from e
+            logger.error("Failed to list conversations from Cosmos DB: %s", e)
+            return [], None
+    else:
+        # In-memory fallback: the token is the offset of the next page
+        start = int(continuation_token or 0)
+        if start < 0:
+            raise ValueError(f"Invalid continuation token: {continuation_token}")
+        convos = _memory_summaries(user_id)
+        end = start + page_size
+        return convos[start:end], str(end) if end < len(convos) else None
 
 
 def get_conversation(conversation_id: str, user_id: str = "anonymous") -> dict | None:
@@ -184,7 +348,11 @@ def get_conversation(conversation_id: str, user_id: str = "anonymous") -> dict |
         try:
             from azure.cosmos.exceptions import CosmosResourceNotFoundError
 
+            cached = _cache_get((user_id, conversation_id))
+            if cached is not None:
+                return cached
             item = container.read_item(item=conversation_id, partition_key=user_id)
+            _cache_put((user_id, conversation_id), item)
             return item
         except CosmosResourceNotFoundError:
             return None
@@ -195,6 +363,7 @@ def get_conversation(conversation_id: str, user_id: str = "anonymous") -> dict |
 def delete_conversation(conversation_id: str, user_id: str = "anonymous") -> bool:
     """Delete a conversation."""
     container = _get_container()
+    _cache_drop((user_id, conversation_id))
 
     if container is not None:
         try:
@@ -206,7 +375,4 @@ def delete_conversation(conversation_id: str, user_id: str = "anonymous") -> boo
             logger.error("Failed to delete conversation: %s", e)
             return False
     else:
-        if conversation_id in _memory_store:
-            del _memory_store[conversation_id]
-            return True
-        return False
+        return _memory_store.pop(conversation_id, None) is not None
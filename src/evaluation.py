@@ -9,13 +9,52 @@ Usage:
         scores = await evaluate_content(query="...", response="...", context="...")
 """
 
+import asyncio
 import logging
 from importlib.util import find_spec
+from typing import Any
 
 from src.config import EVAL_API_VERSION, EVAL_AZURE_ENDPOINT, EVAL_MODEL_DEPLOYMENT, EVAL_TOKEN_SCOPE
 
 logger = logging.getLogger(__name__)
 
+_CORE_METRICS = ("relevance", "coherence", "fluency")
+
+# Evaluators built for the current token; rebuilt only when it rotates
+_evaluator_cache: tuple[str, dict[str, Any]] | None = None
+
+
+def _get_evaluators(api_key: str) -> dict[str, Any]:
+    """Return evaluator instances for api_key, building them once per token.
+
+    Groundedness is omitted when its evaluator cannot be constructed.
+    """
+    global _evaluator_cache
+    if _evaluator_cache is not None and _evaluator_cache[0] == api_key:
+        return _evaluator_cache[1]
+
+    from azure.ai.evaluation import CoherenceEvaluator, FluencyEvaluator, GroundednessEvaluator, RelevanceEvaluator
+
+    # Model config for AI-assisted evaluators
+    model_config = {
+        "azure_endpoint": EVAL_AZURE_ENDPOINT,
+        "azure_deployment": EVAL_MODEL_DEPLOYMENT,
+        "api_version": EVAL_API_VERSION,
+        "api_key": api_key,
+    }
+    evaluators: dict[str, Any] = {
+        "relevance": RelevanceEvaluator(model_config=model_config),
+        "coherence": CoherenceEvaluator(model_config=model_config),
+        "fluency": FluencyEvaluator(model_config=model_config),
+    }
+    try:
+        evaluators["groundedness"] = GroundednessEvaluator(model_config=model_config)
+    except (ValueError, RuntimeError, TypeError) as e:
+        logger.warning("Groundedness evaluator failed: %s", e)
+
+    _evaluator_cache = (api_key, evaluators)
+    return evaluators
+
 
 def is_configured() -> bool:
     """Check if evaluation SDK prerequisites are available."""
@@ -43,75 +82,57 @@ async def evaluate_content(
     results: dict[str, float | str] = {}
 
     try:
-        from azure.ai.evaluation import CoherenceEvaluator, FluencyEvaluator, RelevanceEvaluator
         from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
         from azure.identity import CredentialUnavailableError
 
-        # Model config for AI-assisted evaluators
-        model_config = {
-            "azure_endpoint": EVAL_AZURE_ENDPOINT,
-            "azure_deployment": EVAL_MODEL_DEPLOYMENT,
-            "api_version": EVAL_API_VERSION,
-        }
+        from src.client import get_token
 
         # Authenticate with DefaultAzureCredential via api_key (AAD token).
         # The cognitiveservices scope works on the resource-level endpoint.
         try:
-            from azure.identity import DefaultAzureCredential
-
-            credential = DefaultAzureCredential()
-            token = credential.get_token(EVAL_TOKEN_SCOPE)
-            model_config["api_key"] = token.token
+            api_key = await get_token(EVAL_TOKEN_SCOPE)
         except (ClientAuthenticationError, CredentialUnavailableError, ValueError, RuntimeError) as e:
             logger.warning("Failed to get credential for evaluation: %s", e)
             return {"error": f"Authentication failed: {e}"}
 
-        # Run evaluators — collect errors per metric for diagnostics
-        evaluators = {
-            "relevance": RelevanceEvaluator(model_config=model_config),
-            "coherence": CoherenceEvaluator(model_config=model_config),
-            "fluency": FluencyEvaluator(model_config=model_config),
-        }
+        evaluators = _get_evaluators(api_key)
+        # Groundedness requires context
+        groundedness = evaluators.get("groundedness") if context else None
+
+        # Each evaluator is a blocking LLM call; run them side by side in
+        # worker threads so the total is the slowest call, not the sum
+        calls = {name: asyncio.to_thread(evaluators[name], query=query, response=response) for name in _CORE_METRICS}
+        if groundedness is not None:
+            calls["groundedness"] = asyncio.to_thread(groundedness, response=response, context=context)
+        outcomes = await asyncio.gather(*calls.values(), return_exceptions=True)
 
+        # Collect scores — and errors per metric for diagnostics
         eval_errors: list[str] = []
-        for name, evaluator in evaluators.items():
-            try:
-                result = evaluator(query=query, response=response)
-                logger.info("Evaluator '%s' raw result: %s", name, result)
-                score = result.get(name)
-                reason = result.get(f"{name}_reason", "")
-                if score is not None:
-                    results[name] = float(score)
-                if reason:
-                    results[f"{name}_reason"] = reason
-            except (HttpResponseError, ValueError, RuntimeError, TypeError) as e:
-                logger.warning("Evaluator '%s' failed: %s", name, e, exc_info=True)
-                results[name] = -1
-                eval_errors.append(f"{name}: {e}")
+        for name, outcome in zip(calls, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, (HttpResponseError, ValueError, RuntimeError, TypeError)):
+                    raise outcome
+                if name == "groundedness":
+                    logger.warning("Groundedness evaluator failed: %s", outcome)
+                else:
+                    logger.warning("Evaluator '%s' failed: %s", name, outcome, exc_info=outcome)
+                    results[name] = -1
+                    eval_errors.append(f"{name}: {outcome}")
+                continue
+            logger.info("Evaluator '%s' raw result: %s", name, outcome)
+            score = outcome.get(name)
+            reason = outcome.get(f"{name}_reason", "")
+            if score is not None:
+                results[name] = float(score)
+            if reason:
+                results[f"{name}_reason"] = reason
 
         # If ALL evaluators failed, return error with details
-        core_metrics = ["relevance", "coherence", "fluency"]
-        if all(results.get(m) == -1 for m in core_metrics):
+        if all(results.get(m) == -1 for m in _CORE_METRICS):
             error_detail = "; ".join(eval_errors) if eval_errors else "All evaluators returned -1"
             logger.error("All evaluators failed: %s", error_detail)
             return {"error": f"All evaluators failed: {error_detail}"}
 
-        # Groundedness requires context
-        if context:
-            try:
-                from azure.ai.evaluation import GroundednessEvaluator
-
-                groundedness = GroundednessEvaluator(model_config=model_config)
-                result = groundedness(response=response, context=context)
-                score = result.get("groundedness")
-                reason = result.get("groundedness_reason", "")
-                if score is not None:
-                    results["groundedness"] = float(score)
-                if reason:
-                    results["groundedness_reason"] = reason
-            except (HttpResponseError, ValueError, RuntimeError, TypeError) as e:
-                logger.warning("Groundedness evaluator failed: %s", e)
-
     except ImportError:
         logger.warning("azure-ai-evaluation not installed — run: uv add azure-ai-evaluation")
         results["error"] = "azure-ai-evaluation not installed"
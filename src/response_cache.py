@@ -0,0 +1,80 @@
+"""In-memory response cache for single-turn agent requests.
+
+Identical single-turn requests (same message, platforms and generation
+options) replay the recorded agent stream instead of re-running the model
+and its tools. Bounded LRU with a per-entry TTL; disabled unless
+RESPONSE_CACHE_TTL_S is greater than zero.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from src.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_S
+
+logger = logging.getLogger(__name__)
+
+# key → (monotonic expiry, recorded stream chunks); oldest first.
+# Only touched from the event loop with no awaits in between, so no lock.
+_cache: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+
+
+def is_enabled() -> bool:
+    """Check if the response cache is enabled."""
+    return RESPONSE_CACHE_TTL_S > 0 and RESPONSE_CACHE_MAX_ENTRIES > 0
+
+
+def make_key(
+    message: str,
+    platforms: list[str],
+    content_type: str,
+    language: str,
+    reasoning_effort: str,
+    reasoning_summary: str,
+    ab_mode: bool,
+    bilingual: bool,
+    bilingual_style: str,
+) -> str:
+    """Build a cache key from the request fields that shape the output."""
+    canonical = "\x1f".join(
+        (
+            message,
+            ",".join(sorted(platforms)),
+            content_type,
+            language,
+            reasoning_effort,
+            reasoning_summary,
+            str(ab_mode),
+            str(bilingual),
+            bilingual_style,
+        )
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def get(key: str) -> list[str] | None:
+    """Return the recorded chunks for a key, or None if missing/expired."""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expires_at, chunks = entry
+    if time.monotonic() >= expires_at:
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return chunks
+
+
+def put(key: str, chunks: list[str]) -> None:
+    """Store recorded chunks, evicting the least recently used entries."""
+    _cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL_S, chunks)
+    _cache.move_to_end(key)
+    while len(_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    logger.debug("Response cached (%d entries)", len(_cache))
+
+
+def clear() -> None:
+    """Drop all cached responses."""
+    _cache.clear()
@@ -11,9 +11,10 @@ from contextvars import ContextVar
 from typing import Annotated
 
 from agent_framework import tool
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from azure.identity import get_bearer_token_provider
 from openai import OpenAI
 
+from src.client import get_credential
 from src.config import AZURE_AI_SCOPE, IMAGE_DEPLOYMENT_NAME, MODEL_DEPLOYMENT_NAME, RESPONSES_API_BASE_URL
 
 logger = logging.getLogger(__name__)
@@ -206,8 +207,7 @@ async def review_content(
 _image_client: OpenAI | None = None
 
 # Azure AD token provider — handles caching and automatic refresh
-_image_credential = DefaultAzureCredential()
-_image_token_provider = get_bearer_token_provider(_image_credential, AZURE_AI_SCOPE)
+_image_token_provider = get_bearer_token_provider(get_credential(), AZURE_AI_SCOPE)
 
 
 def _get_image_client() -> OpenAI:
@@ -257,17 +257,12 @@ PLATFORM_IMAGE_DIMENSIONS: dict[str, dict] = {
 }
 
 
-@tool(approval_mode="never_require")
-async def generate_image(
-    prompt: Annotated[str, "Detailed image generation prompt in English"],
-    platform: Annotated[str, "Target platform: linkedin, x, or instagram"],
-    style: Annotated[str, "Visual style: photo, illustration, minimal, abstract"] = "photo",
-) -> str:
-    """Generate a social media visual using GPT Image (gpt-image-1.5).
+async def render_image(prompt: str, platform: str, style: str = "photo") -> str | None:
+    """Render a platform-optimized image and return its base64 data.
 
-    Creates a platform-optimized image from a text prompt using the
-    Responses API with the built-in image_generation tool.
-    Returns a JSON object with metadata (image data stored via side-channel).
+    Unlike the generate_image tool this does not touch the per-request
+    image store, so concurrent callers cannot see each other's images.
+    Returns None when the response carries no image; API errors propagate.
     """
     platform_key = platform.lower().strip()
     size = IMAGE_SIZES.get(platform_key, "1024x1024")
@@ -284,6 +279,47 @@ async def generate_image(
         f"Professional, modern, high quality. No text overlays."
     )
 
+    client = _get_image_client()
+
+    # Use Responses API with image_generation tool (runs in thread
+    # since the OpenAI SDK's sync client blocks the event loop)
+    def _sync_generate():
+        return client.responses.create(
+            model=MODEL_DEPLOYMENT_NAME,
+            input=enhanced_prompt,
+            tools=[{"type": "image_generation"}],
+        )
+
+    response = await asyncio.to_thread(_sync_generate)
+
+    # Extract image data from response output
+    image_items = [item for item in (response.output or []) if item.type == "image_generation_call"]
+
+    if not image_items or not getattr(image_items[0], "result", None):
+        out_types = [i.type for i in (response.output or [])]
+        logger.warning(
+            "No image data in response. Output types: %s",
+            out_types,
+        )
+        return None
+    return image_items[0].result
+
+
+@tool(approval_mode="never_require")
+async def generate_image(
+    prompt: Annotated[str, "Detailed image generation prompt in English"],
+    platform: Annotated[str, "Target platform: linkedin, x, or instagram"],
+    style: Annotated[str, "Visual style: photo, illustration, minimal, abstract"] = "photo",
+) -> str:
+    """Generate a social media visual using GPT Image (gpt-image-1.5).
+
+    Creates a platform-optimized image from a text prompt using the
+    Responses API with the built-in image_generation tool.
+    Returns a JSON object with metadata (image data stored via side-channel).
+    """
+    platform_key = platform.lower().strip()
+    size = IMAGE_SIZES.get(platform_key, "1024x1024")
+
     logger.info(
         "generate_image called: platform=%s, style=%s, prompt=%s...",
         platform_key,
@@ -292,28 +328,9 @@ async def generate_image(
     )
 
     try:
-        client = _get_image_client()
-
-        # Use Responses API with image_generation tool (runs in thread
-        # since the OpenAI SDK's sync client blocks the event loop)
-        def _sync_generate():
-            return client.responses.create(
-                model=MODEL_DEPLOYMENT_NAME,
-                input=enhanced_prompt,
-                tools=[{"type": "image_generation"}],
-            )
-
-        response = await asyncio.to_thread(_sync_generate)
+        image_b64 = await render_image(prompt, platform_key, style)
 
-        # Extract image data from response output
-        image_items = [item for item in (response.output or []) if item.type == "image_generation_call"]
-
-        if not image_items or not getattr(image_items[0], "result", None):
-            out_types = [i.type for i in (response.output or [])]
-            logger.warning(
-                "No image data in response. Output types: %s",
-                out_types,
-            )
+        if image_b64 is None:
             return json.dumps(
                 {
                     "platform": platform_key,
@@ -323,8 +340,6 @@ async def generate_image(
                 ensure_ascii=False,
             )
 
-        image_b64 = image_items[0].result
-
         # Store image in per-request side-channel (NOT returned to LLM)
         # This avoids sending ~1-2MB of base64 through the model context
         # Write to both ContextVar and module-level fallback for reliability
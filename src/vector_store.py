@@ -8,10 +8,10 @@ import logging
 import os
 from pathlib import Path
 
-from azure.identity import DefaultAzureCredential
 from dotenv import set_key
 from openai import AzureOpenAI
 
+from src.client import get_credential
 from src.config import PROJECT_ENDPOINT, VECTOR_STORE_ID
 
 logger = logging.getLogger(__name__)
@@ -25,8 +25,7 @@ from src.config import AZURE_AI_SCOPE as _AZURE_AI_SCOPE
 
 def _get_openai_client() -> AzureOpenAI:
     """Create an AzureOpenAI client for Vector Store operations."""
-    credential = DefaultAzureCredential()
-    token = credential.get_token(_AZURE_AI_SCOPE)
+    token = get_credential().get_token(_AZURE_AI_SCOPE)
 
     return AzureOpenAI(
         azure_endpoint=PROJECT_ENDPOINT,
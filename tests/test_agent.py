@@ -1,14 +1,32 @@
 """Tests for src/agent.py — agent creation helpers and tool event formatting."""
 
+import asyncio
 import json
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
 
 from src.agent import (
+    _HANDLERS,
+    REASONING_APPEND_END,
+    REASONING_APPEND_START,
     REASONING_END,
     REASONING_START,
     REASONING_THROTTLE_MS,
     TOOL_EVENT_END,
     TOOL_EVENT_START,
+    StreamState,
+    _buffered,
     _build_query_with_context,
+    _build_tools,
+    _get_agent,
+    _is_retryable_error,
+    _match_hosted_tool,
+    _raw_event_attr,
+    _reasoning_options,
+    _tool_config,
     create_tool_event,
 )
 
@@ -50,6 +68,19 @@ class TestCreateToolEvent:
         # ISO 8601 should contain T and +00:00 or Z
         assert "T" in data["timestamp"]
 
+    def test_timestamp_utc_z_suffix(self):
+        result = create_tool_event("test_tool", "started")
+        json_str = result[len(TOOL_EVENT_START) : -len(TOOL_EVENT_END)]
+        data = json.loads(json_str)
+        assert data["timestamp"].endswith("Z")
+
+    def test_explicit_timestamp(self):
+        ts = datetime(2026, 2, 1, 12, 30, tzinfo=UTC)
+        result = create_tool_event("test_tool", "started", timestamp=ts)
+        json_str = result[len(TOOL_EVENT_START) : -len(TOOL_EVENT_END)]
+        data = json.loads(json_str)
+        assert data["timestamp"] == "2026-02-01T12:30:00Z"
+
     def test_japanese_message(self):
         result = create_tool_event("test", "completed", "画像生成完了")
         json_str = result[len(TOOL_EVENT_START) : -len(TOOL_EVENT_END)]
@@ -111,6 +142,12 @@ class TestBuildQueryWithContext:
         assert "instagram" in result
         assert "ja" in result
 
+    def test_token_budget_per_platform(self):
+        result = _build_query_with_context(
+            message="test", platforms=["x", "linkedin"], content_type="trend", language="en"
+        )
+        assert "token budget per post body: x 80, linkedin 750" in result
+
     def test_empty_history(self):
         result = _build_query_with_context(
             message="test",
@@ -122,6 +159,25 @@ class TestBuildQueryWithContext:
         assert "Previous conversation" not in result
 
 
+class TestMatchHostedTool:
+    """Test _match_hosted_tool helper."""
+
+    def test_exact_output_item_types(self):
+        assert _match_hosted_tool("web_search_call") == "web_search"
+        assert _match_hosted_tool("file_search_call") == "file_search"
+        assert _match_hosted_tool("mcp_call") == "mcp_search"
+        assert _match_hosted_tool("mcp_list_tools") == "mcp_search"
+
+    def test_raw_stream_event_types(self):
+        assert _match_hosted_tool("response.web_search_call.in_progress") == "web_search"
+        assert _match_hosted_tool("response.file_search_call.completed") == "file_search"
+        assert _match_hosted_tool("response.mcp_call_arguments.delta") == "mcp_search"
+
+    def test_no_match(self):
+        assert _match_hosted_tool("response.output_text.delta") is None
+        assert _match_hosted_tool("") is None
+
+
 class TestConstants:
     """Test agent module constants."""
 
@@ -134,3 +190,292 @@ class TestConstants:
     def test_throttle_value(self):
         assert REASONING_THROTTLE_MS == 100
         assert isinstance(REASONING_THROTTLE_MS, int)
+
+
+class TestIsRetryableError:
+    """Test _is_retryable_error classification."""
+
+    def test_transient_errors(self):
+        for msg in (
+            "Failed to complete the prompt",
+            "Error code: 429",
+            "Rate limit exceeded",
+            "503 Service Unavailable",
+            "Request timed out",
+            "Read TIMEOUT",
+        ):
+            assert _is_retryable_error(RuntimeError(msg)), msg
+
+    def test_non_transient_errors(self):
+        assert not _is_retryable_error(ValueError("Invalid API key"))
+        assert not _is_retryable_error(RuntimeError("400 Bad Request"))
+
+
+class TestBuildTools:
+    """Test _build_tools caching."""
+
+    def test_cached_per_configuration(self):
+        first = _build_tools("", "", False)
+        assert _build_tools("", "", False) is first
+        assert _build_tools("", "https://learn.microsoft.com/api/mcp", False) is not first
+
+    def test_tool_config_read_once(self):
+        _tool_config.cache_clear()
+        try:
+            with patch("src.agentic_retrieval.is_configured", return_value=False) as is_configured:
+                assert _tool_config() is _tool_config()
+            assert is_configured.call_count == 1
+        finally:
+            _tool_config.cache_clear()
+
+    def test_optional_tools(self):
+        base = _build_tools("", "", False)
+        with_mcp = _build_tools("", "https://learn.microsoft.com/api/mcp", False)
+        assert len(with_mcp) == len(base) + 1
+
+
+def _content(**kwargs) -> SimpleNamespace:
+    fields = {"type": "", "text": None, "name": None, "call_id": None, "id": None, "annotations": None}
+    return SimpleNamespace(**{**fields, **kwargs})
+
+
+class TestStreamHandlers:
+    """Test the Content.type handler table and StreamState."""
+
+    def _state(self) -> StreamState:
+        from opentelemetry import trace
+
+        return StreamState(tracer=trace.get_tracer(__name__), ctx=None)
+
+    def _feed(self, state: StreamState, *contents: SimpleNamespace) -> list[str]:
+        """Feed each content as its own stream update."""
+        frames: list[str] = []
+        for content in contents:
+            _HANDLERS[content.type](content, state, frames)
+            state.flush_tool_events_into(frames)
+        return frames
+
+    def test_reasoning_deltas_cumulative_and_duplicates(self):
+        state = self._state()
+        self._feed(
+            state,
+            _content(type="text_reasoning", text="Think"),
+            _content(type="text_reasoning", text="ing"),
+            _content(type="text_reasoning", text="ing"),  # re-sent delta
+            _content(type="text_reasoning", text="Thinking more"),  # cumulative
+        )
+        assert "".join(state.reasoning_parts) == "Thinking more"
+        assert state.reasoning_len == len("Thinking more")
+
+    def test_long_reasoning_cumulative_detection(self):
+        state = self._state()
+        first = "".join(f"step {i}. " for i in range(30))  # longer than the sentinel window
+        self._feed(state, _content(type="text_reasoning", text=first))
+        self._feed(state, _content(type="text_reasoning", text=first + "done"))  # cumulative
+        assert "".join(state.reasoning_parts) == first + "done"
+        self._feed(state, _content(type="text_reasoning", text=" next"))  # delta
+        assert "".join(state.reasoning_parts) == first + "done next"
+        assert state.reasoning_tail == (first + "done next")[-64:]
+
+    def test_reasoning_frames_carry_only_new_text(self):
+        state = self._state()
+        with patch("src.agent._REASONING_THROTTLE_NS", 0):
+            frames = self._feed(
+                state,
+                _content(type="text_reasoning", text="Think"),
+                _content(type="text_reasoning", text="ing"),
+                _content(type="text_reasoning", text="Thinking more"),  # cumulative
+            )
+        assert frames == [
+            f"{REASONING_APPEND_START}Think{REASONING_APPEND_END}",
+            f"{REASONING_APPEND_START}ing{REASONING_APPEND_END}",
+            f"{REASONING_APPEND_START} more{REASONING_APPEND_END}",
+        ]
+
+    def test_throttled_reasoning_is_batched(self):
+        state = self._state()
+        state.last_reasoning_send = 2**62  # next send is far in the future
+        frames = self._feed(
+            state,
+            _content(type="text_reasoning", text="a"),
+            _content(type="text_reasoning", text="b"),
+        )
+        assert frames == []
+        state.last_reasoning_send = 0
+        frames = self._feed(state, _content(type="text_reasoning", text="c"))
+        assert frames == [f"{REASONING_APPEND_START}abc{REASONING_APPEND_END}"]
+
+    def test_reasoning_ignored_when_display_off(self):
+        state = self._state()
+        state.emit_reasoning = False
+        with patch("src.agent._REASONING_THROTTLE_NS", 0):
+            frames = self._feed(state, _content(type="text_reasoning", text="Thinking"))
+        assert frames == []
+        assert state.reasoning_parts == []
+
+    def test_function_call_emitted_once(self):
+        state = self._state()
+        call = _content(type="function_call", name="generate_content", call_id="c1")
+        frames = self._feed(state, call, call, _content(type="function_result", call_id="c1"))
+        assert len(frames) == 2
+        assert '"status":"started"' in frames[0]
+        assert '"tool":"generate_content"' in frames[1]
+        assert '"status":"completed"' in frames[1]
+
+    def test_function_call_name_learned_after_start(self):
+        state = self._state()
+        frames = self._feed(
+            state,
+            _content(type="function_call", call_id="c1"),  # name not streamed yet
+            _content(type="function_call", name="review_content", call_id="c1"),
+            _content(type="function_call", name="review_content", call_id="c1"),
+            _content(type="function_result", call_id="c1"),
+            _content(type="function_result", call_id="c1"),
+        )
+        assert len(frames) == 2
+        assert '"tool":"review_content"' in frames[1]
+
+    def test_tool_events_of_one_update_share_a_frame(self):
+        state = self._state()
+        frames: list[str] = []
+        for content in (
+            _content(type="function_call", name="generate_content", call_id="c1"),
+            _content(type="function_call", name="review_content", call_id="c2"),
+        ):
+            _HANDLERS[content.type](content, state, frames)
+        assert frames == []
+        frame = state.flush_tool_events()
+        events = json.loads(frame[len(TOOL_EVENT_START) : -len(TOOL_EVENT_END)])
+        assert [e["tool"] for e in events] == ["generate_content", "review_content"]
+        assert events[0]["timestamp"] == events[1]["timestamp"]
+        assert state.flush_tool_events() is None
+
+    def test_tool_events_keep_content_order_within_an_update(self):
+        state = self._state()
+        frames: list[str] = []
+        for content in (
+            _content(type="function_call", name="generate_content", call_id="c1"),
+            _content(type="text", text="Hello"),
+            _content(type="function_result", call_id="c1"),
+        ):
+            _HANDLERS[content.type](content, state, frames)
+        state.flush_tool_events_into(frames)
+        assert len(frames) == 3
+        assert frames[0].startswith(TOOL_EVENT_START)
+        assert '"status":"started"' in frames[0]
+        assert frames[1] == "Hello"
+        assert '"status":"completed"' in frames[2]
+
+    def test_hosted_content_marks_detected(self):
+        state = self._state()
+        frames = self._feed(state, _content(type="web_search_call", id="ws1"))
+        assert len(frames) == 1
+        assert state.detected("web_search")
+        assert not state.detected("file_search")
+
+
+class TestRawEventAttr:
+    """Test _raw_event_attr SDK probe."""
+
+    def test_installed_sdk(self):
+        from agent_framework import AgentResponseUpdate
+
+        assert _raw_event_attr(AgentResponseUpdate) == "raw_representation"
+
+    def test_legacy_attribute(self):
+        class LegacyUpdate:
+            def __init__(self, contents=None, raw_event=None):
+                self.raw_event = raw_event
+
+        assert _raw_event_attr.__wrapped__(LegacyUpdate) == "raw_event"
+
+
+class TestReasoningOptions:
+    """Test _reasoning_options helper."""
+
+    def test_effort_and_summary(self):
+        assert _reasoning_options("high", "auto") == {"reasoning": {"effort": "high", "summary": "auto"}}
+
+    def test_summary_off(self):
+        assert _reasoning_options("low", "off") == {"reasoning": {"effort": "low"}}
+
+    def test_all_off(self):
+        assert _reasoning_options("off", "off") is None
+
+    def test_cached(self):
+        assert _reasoning_options("medium", "auto") is _reasoning_options("medium", "auto")
+
+
+class TestGetAgent:
+    """Test _get_agent caching."""
+
+    def test_reused_per_configuration(self):
+        calls = []
+
+        class FakeClient:
+            def as_agent(self, **kwargs):
+                calls.append(kwargs)
+                return object()
+
+        _get_agent.cache_clear()
+        try:
+            with patch("src.client.get_client", return_value=FakeClient()):
+                first = _get_agent(("", "", False), "medium", "auto", False, False, "parallel")
+                assert _get_agent(("", "", False), "medium", "auto", False, False, "parallel") is first
+                assert _get_agent(("", "", False), "high", "auto", False, False, "parallel") is not first
+        finally:
+            _get_agent.cache_clear()
+
+        assert len(calls) == 2
+        assert calls[1]["default_options"] == {"reasoning": {"effort": "high", "summary": "auto"}}
+
+
+class TestBuffered:
+    """Test the bounded producer/consumer buffer around the agent stream."""
+
+    async def test_preserves_order(self):
+        async def source():
+            for i in range(10):
+                yield str(i)
+
+        assert [chunk async for chunk in _buffered(source(), maxsize=2)] == [str(i) for i in range(10)]
+
+    async def test_producer_runs_ahead(self):
+        produced = []
+
+        async def source():
+            for i in range(5):
+                produced.append(i)
+                yield str(i)
+
+        stream = _buffered(source(), maxsize=8)
+        assert await anext(stream) == "0"
+        await asyncio.sleep(0)
+        assert len(produced) == 5
+        await stream.aclose()
+
+    async def test_error_reraised(self):
+        async def source():
+            yield "partial"
+            raise RuntimeError("boom")
+
+        chunks = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for chunk in _buffered(source()):
+                chunks.append(chunk)
+        assert chunks == ["partial"]
+
+    async def test_close_stops_producer(self):
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                while True:
+                    yield "x"
+            finally:
+                closed.set()
+
+        stream = _buffered(source(), maxsize=1)
+        assert await anext(stream) == "x"
+        await stream.aclose()
+        assert closed.is_set()
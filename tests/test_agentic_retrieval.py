@@ -1,14 +1,19 @@
 """Tests for src/agentic_retrieval.py — Foundry IQ Agentic Retrieval."""
 
+import asyncio
 import json
 from unittest.mock import patch
 
+import pytest
+
+import src.agentic_retrieval as ar
 from src.agentic_retrieval import (
     API_VERSION,
     ReasoningEffort,
     _format_results,
     _parse_response,
     is_configured,
+    retrieve,
 )
 
 
@@ -134,6 +139,27 @@ class TestParseResponse:
         result = _parse_response(response, "low")
         assert len(result["references"]) == 1
 
+    def test_minimal_mode_enriched_from_references(self):
+        docs = [
+            {"ref_id": 0, "title": "", "content": "Brand voice"},
+            {"ref_id": 1, "title": "Own title", "content": "Tone"},
+        ]
+        response = {
+            "response": [{"content": [{"type": "text", "text": json.dumps(docs)}]}],
+            "references": [
+                {"id": "0", "title": "Brand Guidelines", "rerankerScore": 2.5},
+                {"id": "1", "title": "Ref title", "rerankerScore": 1.5},
+            ],
+        }
+        result = _parse_response(response, "minimal")
+        assert [s["title"] for s in result["sources"]] == ["Brand Guidelines", "Own title"]
+        assert [s["score"] for s in result["sources"]] == [2.5, 1.5]
+
+    def test_minimal_mode_title_defaults_to_empty(self):
+        docs = [{"ref_id": 7, "content": "No titles anywhere"}]
+        response = {"response": [{"content": [{"type": "text", "text": json.dumps(docs)}]}]}
+        assert _parse_response(response, "minimal")["sources"][0]["title"] == ""
+
     def test_multiple_chunks(self):
         chunks = [
             {
@@ -206,6 +232,13 @@ class TestFormatResults:
         result = _format_results(data)
         assert "truncated" in result
 
+    def test_total_budget(self):
+        data = {"sources": [{"content": "y" * 3000, "source": "", "title": "", "score": 0.5}] * 10}
+        result = _format_results(data)
+        assert result.count("y") == 12000
+        assert "ref_6" in result
+        assert "ref_7" not in result
+
     def test_activity_footer(self):
         data = {
             "sources": [{"content": "test", "source": "", "title": "", "score": 0.5}],
@@ -225,6 +258,88 @@ class TestFormatResults:
         assert "brand-docs" in result
 
 
+class TestRetrieveCache:
+    """Test retrieve() result caching and request sharing."""
+
+    @pytest.fixture(autouse=True)
+    def _configured(self):
+        ar._cache.clear()
+        with (
+            patch("src.agentic_retrieval.AI_SEARCH_ENDPOINT", "https://search.example.com"),
+            patch("src.agentic_retrieval.AI_SEARCH_KNOWLEDGE_BASE_NAME", "my-kb"),
+        ):
+            yield
+        ar._cache.clear()
+
+    @staticmethod
+    def _fake_upstream(calls: list, result: dict):
+        async def _retrieve_uncached(query, effort):
+            calls.append((query, effort))
+            await asyncio.sleep(0)
+            return result
+
+        return _retrieve_uncached
+
+    async def test_repeated_query_served_from_cache(self):
+        calls: list = []
+        with patch("src.agentic_retrieval._retrieve_uncached", self._fake_upstream(calls, {"sources": []})):
+            first = await retrieve("Brand Guidelines", "low")
+            second = await retrieve("  brand guidelines ", "low")
+        assert first == second == {"sources": []}
+        assert len(calls) == 1
+
+    async def test_effort_is_part_of_key(self):
+        calls: list = []
+        with patch("src.agentic_retrieval._retrieve_uncached", self._fake_upstream(calls, {"sources": []})):
+            await retrieve("q", "low")
+            await retrieve("q", "medium")
+        assert len(calls) == 2
+
+    async def test_errors_not_cached(self):
+        calls: list = []
+        with patch("src.agentic_retrieval._retrieve_uncached", self._fake_upstream(calls, {"error": "Search failed"})):
+            await retrieve("q", "low")
+            await retrieve("q", "low")
+        assert len(calls) == 2
+
+
+class TestHttpClient:
+    """Test the shared AsyncClient lifecycle."""
+
+    async def test_client_reused_until_closed(self):
+        client = ar._get_http_client()
+        assert ar._get_http_client() is client
+        await ar.aclose()
+        assert client.is_closed
+        assert ar._http_client is None
+
+
+class TestRetrieveUncached:
+    """Test the upstream request and response parsing."""
+
+    @pytest.fixture(autouse=True)
+    def _configured(self):
+        with (
+            patch("src.agentic_retrieval.AI_SEARCH_ENDPOINT", "https://search.example.com"),
+            patch("src.agentic_retrieval.AI_SEARCH_KNOWLEDGE_BASE_NAME", "my-kb"),
+            patch("src.agentic_retrieval.AI_SEARCH_API_KEY", "key"),
+        ):
+            yield
+
+    @pytest.mark.parametrize("inline_max", [64 * 1024, 0])
+    async def test_response_parsed(self, inline_max):
+        import httpx
+
+        payload = {"response": [{"content": [{"type": "text", "text": "Brand voice"}]}]}
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+        with (
+            patch("src.agentic_retrieval._http_client", httpx.AsyncClient(transport=transport)),
+            patch("src.agentic_retrieval._INLINE_PARSE_MAX_BYTES", inline_max),
+        ):
+            result = await ar._retrieve_uncached("q", "low")
+        assert result["sources"][0]["content"] == "Brand voice"
+
+
 class TestApiVersion:
     """Test API version constant."""
 
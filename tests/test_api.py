@@ -1,12 +1,20 @@
 """Tests for src/api.py — FastAPI endpoints."""
 
+import asyncio
 import json
 from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 
-from src.api import REASONING_PATTERN, TOOL_EVENT_PATTERN, _extract_image_prompts, app
+from src.api import (
+    REASONING_PATTERN,
+    TOOL_EVENT_PATTERN,
+    _extract_image_prompts,
+    _image_event,
+    _split_stream_chunk,
+    app,
+)
 
 
 @pytest.fixture(name="api_client")
@@ -50,6 +58,28 @@ class TestConversationEndpoints:
         assert len(data) == 1
         assert data[0]["id"] == "c1"
 
+    def test_list_paginated(self, api_client):
+        from src.database import save_conversation
+
+        for i in range(3):
+            save_conversation(f"c{i}", f"Chat {i}", [])
+        first = api_client.get("/api/conversations", params={"page_size": 2})
+        assert len(first.json()) == 2
+        token = first.headers["X-Continuation-Token"]
+        last = api_client.get("/api/conversations", params={"page_size": 2, "continuation_token": token})
+        assert len(last.json()) == 1
+        assert "X-Continuation-Token" not in last.headers
+
+    def test_continuation_header_exposed_to_cors_clients(self, api_client):
+        response = api_client.get(
+            "/api/conversations", params={"page_size": 1}, headers={"Origin": "http://localhost:5173"}
+        )
+        assert "X-Continuation-Token" in response.headers["access-control-expose-headers"]
+
+    def test_list_invalid_token_returns_400(self, api_client):
+        response = api_client.get("/api/conversations", params={"page_size": 2, "continuation_token": "x"})
+        assert response.status_code == 400
+
     def test_get_conversation(self, api_client):
         from src.database import save_conversation
 
@@ -118,6 +148,54 @@ class TestChatEndpoint:
         # Should contain a done event
         assert '"type": "done"' in body or '"type":"done"' in body
 
+    @patch("src.api.run_agent_stream")
+    def test_chat_text_event_envelope(self, mock_stream, api_client, sample_chat_body):
+        async def fake_stream(*_args, **_kwargs):
+            yield 'Say "hi"\n日本語'
+
+        mock_stream.return_value = fake_stream()
+        response = api_client.post("/api/chat", json=sample_chat_body)
+        events = [json.loads(e) for e in response.text.split("\n\n") if e.startswith('{"choices"')]
+        assert len(events) == 1
+        assert events[0]["choices"][0]["messages"][0] == {"role": "assistant", "content": 'Say "hi"\n日本語'}
+        assert events[0]["thread_id"]
+
+    @patch("src.api.save_conversation", side_effect=RuntimeError("save failed"))
+    @patch("src.api.run_agent_stream")
+    def test_failed_save_cancels_safety_check(self, mock_stream, _mock_save, api_client, sample_chat_body):
+        cancelled = []
+
+        async def fake_stream(*_args, **_kwargs):
+            yield "content text"
+
+        async def slow_safety(_text):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        mock_stream.return_value = fake_stream()
+        with patch("src.api.analyze_safety", slow_safety):
+            response = api_client.post("/api/chat", json=sample_chat_body)
+        assert '"error"' in response.text
+        assert cancelled == [True]
+
+
+class TestJsonBodyEndpoints:
+    """Test body parsing of POST /api/safety and /api/evaluate."""
+
+    @pytest.mark.parametrize("path", ["/api/safety", "/api/evaluate"])
+    def test_invalid_json_returns_400(self, api_client, path):
+        response = api_client.post(path, content=b"{not json", headers={"Content-Type": "application/json"})
+        assert response.status_code == 400
+        assert response.json() == {"error": "Invalid JSON"}
+
+    def test_missing_text_returns_400(self, api_client):
+        response = api_client.post("/api/safety", json={"text": ""})
+        assert response.status_code == 400
+        assert response.json() == {"error": "text is required"}
+
 
 class TestRegexPatterns:
     """Test the regex patterns used for SSE parsing."""
@@ -146,6 +224,58 @@ class TestRegexPatterns:
         assert "Step 1" in match.group(1)
         assert "Step 3" in match.group(1)
 
+    def test_split_stream_chunk_mixed(self):
+        text = (
+            '__TOOL_EVENT__{"tool":"web_search"}__END_TOOL_EVENT__'
+            "Hello "
+            "__REASONING_REPLACE__Step 1\nStep 2__END_REASONING_REPLACE__"
+            "world"
+        )
+        assert _split_stream_chunk(text) == [
+            ("tool_event", '{"tool":"web_search"}'),
+            ("text", "Hello "),
+            ("reasoning", "Step 1\nStep 2"),
+            ("text", "world"),
+        ]
+
+    def test_split_stream_chunk_reasoning_append(self):
+        text = "__REASONING_APPEND__more__END_REASONING_APPEND__"
+        assert _split_stream_chunk(text) == [("reasoning_delta", "more")]
+
+    def test_split_stream_chunk_plain_text(self):
+        assert _split_stream_chunk("snake_case text") == [("text", "snake_case text")]
+        assert _split_stream_chunk("") == []
+
+    def test_split_stream_chunk_repeated_markers(self):
+        tool = "__TOOL_EVENT__{}__END_TOOL_EVENT__"
+        chunk = f"{tool}a__REASONING_APPEND__r__END_REASONING_APPEND__{tool}b{tool}"
+        kinds = [kind for kind, _ in _split_stream_chunk(chunk)]
+        assert kinds == ["tool_event", "text", "reasoning_delta", "tool_event", "text", "tool_event"]
+
+    def test_split_stream_chunk_unterminated_marker_is_text(self):
+        text = "Hello __TOOL_EVENT__{partial"
+        assert _split_stream_chunk(text) == [("text", text)]
+
+
+class TestImageEvent:
+    """Test _image_event IMAGE_DATA payload conversion."""
+
+    def test_agent_payload_spliced(self):
+        payload = json.dumps({"platform": " X ", "image_base64": "QUJD+/="}, separators=(",", ":"))
+        platform, event = _image_event(payload)
+        assert platform == "x"
+        assert json.loads(event) == {"type": "image", "platform": "x", "image_base64": "QUJD+/="}
+        assert event.endswith(b"\n\n")
+
+    def test_other_layout_parsed(self):
+        platform, event = _image_event('{"image_base64": "abc", "platform": "linkedin"}')
+        assert platform == "linkedin"
+        assert json.loads(event)["image_base64"] == "abc"
+
+    def test_invalid_payload(self):
+        assert _image_event("not json") is None
+        assert _image_event("[1]") is None
+
 
 class TestImageFallback:
     """Test image fallback behavior in API layer."""
@@ -183,12 +313,29 @@ class TestImageFallback:
         assert prompts["linkedin"] == "A prompt"
         assert prompts["instagram"] == "B prompt"
 
-    @patch("src.api.pop_pending_images")
-    @patch("src.api.generate_image")
+    def test_extract_image_prompts_wanted_only(self):
+        content = json.dumps(
+            {
+                "contents": [
+                    {"platform": "x", "image_prompt": "X prompt"},
+                    {"platform": "LinkedIn", "image_prompt": "A prompt"},
+                    "not an item",
+                ],
+                "variant_a": {"contents": [{"platform": "instagram", "image_prompt": "B prompt"}]},
+            }
+        )
+        assert _extract_image_prompts(content) == {"linkedin": "A prompt", "instagram": "B prompt"}
+        assert _extract_image_prompts(content, {"instagram"}) == {"instagram": "B prompt"}
+        assert _extract_image_prompts(content, set()) == {}
+
+    def test_extract_image_prompts_fence_with_prose(self):
+        body = json.dumps({"contents": [{"platform": "linkedin", "image_prompt": "office"}]})
+        assert _extract_image_prompts(f"Here you go:\n```json {body}\n```\nDone.") == {"linkedin": "office"}
+        assert _extract_image_prompts(f"```json\n{body}") == {}
+
+    @patch("src.tools.render_image")
     @patch("src.api.run_agent_stream")
-    def test_chat_emits_fallback_image_event(
-        self, mock_stream, mock_generate_image, mock_pop_pending_images, api_client
-    ):
+    def test_chat_emits_fallback_image_event(self, mock_stream, mock_render_image, api_client):
         async def fake_stream(*_args, **_kwargs):
             yield """```json
 {
@@ -218,12 +365,11 @@ class TestImageFallback:
 }
 ```"""
 
-        async def fake_generate_image(*_args, **_kwargs):
-            return '{"status":"generated"}'
+        async def fake_render_image(*_args, **_kwargs):
+            return "abc123"
 
         mock_stream.return_value = fake_stream()
-        mock_generate_image.side_effect = fake_generate_image
-        mock_pop_pending_images.return_value = {"linkedin": "abc123"}
+        mock_render_image.side_effect = fake_render_image
 
         body = {
             "message": "test",
@@ -238,3 +384,34 @@ class TestImageFallback:
         assert response.status_code == 200
         assert '"type": "image"' in response.text or '"type":"image"' in response.text
         assert '"platform": "linkedin"' in response.text or '"platform":"linkedin"' in response.text
+
+    @patch("src.tools.render_image")
+    @patch("src.api.run_agent_stream")
+    def test_fallback_images_emitted_as_completed(self, mock_stream, mock_render_image, api_client):
+        async def fake_stream(*_args, **_kwargs):
+            yield json.dumps(
+                {
+                    "contents": [
+                        {"platform": "linkedin", "body": "a", "image_prompt": "office"},
+                        {"platform": "instagram", "body": "b", "image_prompt": "beach"},
+                    ]
+                }
+            )
+
+        async def fake_render_image(_prompt, platform):
+            if platform == "instagram":
+                await asyncio.sleep(0.05)
+                return "slow"
+            return "fast"
+
+        mock_stream.return_value = fake_stream()
+        mock_render_image.side_effect = fake_render_image
+
+        body = {"message": "test", "platforms": ["linkedin", "instagram"], "content_type": "tech_insight"}
+        response = api_client.post("/api/chat", json=body)
+        images = [
+            event
+            for line in response.text.split("\n\n")
+            if line.startswith("{") and (event := json.loads(line)).get("type") == "image"
+        ]
+        assert [(e["platform"], e["image_base64"]) for e in images] == [("linkedin", "fast"), ("instagram", "slow")]
@@ -0,0 +1,79 @@
+"""Tests for src/async_cache.py — TTL, LRU bound and single-flight fetches."""
+
+import asyncio
+
+import pytest
+
+from src.async_cache import AsyncTTLCache
+
+
+def _fetcher(calls: list, value=None, fail: bool = False):
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError("upstream down")
+        return value if value is not None else {"n": len(calls)}
+
+    return fetch
+
+
+class TestAsyncTTLCache:
+    """Test AsyncTTLCache."""
+
+    async def test_hit_within_ttl(self):
+        cache, calls = AsyncTTLCache("test", 60, 8), []
+        first = await cache.get_or_fetch("k", _fetcher(calls))
+        second = await cache.get_or_fetch("k", _fetcher(calls))
+        assert first == second == {"n": 1}
+        assert len(calls) == 1
+
+    async def test_expired_entry_refetched(self):
+        cache, calls = AsyncTTLCache("test", 0, 8), []
+        await cache.get_or_fetch("k", _fetcher(calls))
+        await cache.get_or_fetch("k", _fetcher(calls))
+        assert len(calls) == 2
+
+    async def test_least_recently_used_evicted(self):
+        cache, calls = AsyncTTLCache("test", 60, 2), []
+        for key in ("a", "b", "a", "c"):
+            await cache.get_or_fetch(key, _fetcher(calls))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert len(cache) == 2
+
+    async def test_concurrent_misses_share_one_fetch(self):
+        cache, calls = AsyncTTLCache("test", 60, 8), []
+        results = await asyncio.gather(*(cache.get_or_fetch("k", _fetcher(calls)) for _ in range(3)))
+        assert results[0] == results[1] == results[2]
+        assert len(calls) == 1
+
+    async def test_uncacheable_value_not_stored(self):
+        cache, calls = AsyncTTLCache("test", 60, 8, cacheable=lambda v: "error" not in v), []
+        await cache.get_or_fetch("k", _fetcher(calls, {"error": "x"}))
+        await cache.get_or_fetch("k", _fetcher(calls, {"error": "x"}))
+        assert len(calls) == 2
+
+    async def test_failed_fetch_raises_and_is_not_stored(self):
+        cache, calls = AsyncTTLCache("test", 60, 8), []
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch("k", _fetcher(calls, fail=True))
+        assert await cache.get_or_fetch("k", _fetcher(calls)) == {"n": 2}
+
+    async def test_cancelled_caller_does_not_cancel_shared_fetch(self):
+        cache, calls = AsyncTTLCache("test", 60, 8), []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return {"ok": True}
+
+        first = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        second = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        assert await second == {"ok": True}
+        assert first.cancelled()
+        assert len(calls) == 1
@@ -0,0 +1,41 @@
+"""Tests for src/client.py — token provider caching."""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import src.client as client
+from src.config import AZURE_AI_SCOPE
+
+
+class TestGetToken:
+    """Test the scope-keyed bearer token cache."""
+
+    async def test_token_reused_until_refresh_margin(self):
+        issued = []
+
+        class FakeCredential:
+            def get_token(self, scope):
+                issued.append(scope)
+                return SimpleNamespace(token=f"tok-{len(issued)}", expires_on=time.time() + 3600)
+
+        with patch("src.client._credential", FakeCredential()), patch.dict("src.client._tokens", clear=True):
+            assert await client._get_token() == "tok-1"
+            assert await client.get_token(AZURE_AI_SCOPE) == "tok-1"
+            client._tokens[AZURE_AI_SCOPE].expires_on = time.time() + 60  # inside refresh margin
+            assert await client._get_token() == "tok-2"
+        assert issued == [AZURE_AI_SCOPE] * 2
+
+    async def test_tokens_cached_per_scope(self):
+        issued = []
+
+        class FakeCredential:
+            def get_token(self, scope):
+                issued.append(scope)
+                return SimpleNamespace(token=f"{scope}-token", expires_on=time.time() + 3600)
+
+        with patch("src.client._credential", FakeCredential()), patch.dict("src.client._tokens", clear=True):
+            assert await client.get_token("scope-a") == "scope-a-token"
+            assert await client.get_token("scope-b") == "scope-b-token"
+            assert await client.get_token("scope-a") == "scope-a-token"
+        assert issued == ["scope-a", "scope-b"]
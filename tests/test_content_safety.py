@@ -0,0 +1,100 @@
+"""Tests for src/content_safety.py — verdict caching and client lifecycle."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import src.content_safety as cs
+
+
+class FakeClient:
+    """Content Safety client stub counting calls."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+
+    async def close(self):
+        self.closed = True
+
+    async def analyze_text(self, _request):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("service unavailable")
+        item = SimpleNamespace(category=SimpleNamespace(value="Hate"), severity=0)
+        return SimpleNamespace(categories_analysis=[item])
+
+
+@pytest.fixture(autouse=True)
+def _configured():
+    cs._verdict_cache.clear()
+    with patch("src.content_safety._configured", True):
+        yield
+    cs._verdict_cache.clear()
+
+
+class TestVerdictCache:
+    """Test caching of analyze_safety verdicts."""
+
+    async def test_analysis_cached_per_text(self):
+        client = FakeClient()
+        with patch("src.content_safety._client", client):
+            first = await cs.analyze_safety("hello")
+            second = await cs.analyze_safety("hello")
+            await cs.analyze_safety("other")
+        assert first == second == {"safe": True, "categories": {"Hate": 0}, "blocked_categories": []}
+        assert client.calls == 2
+
+    async def test_cached_result_is_a_copy(self):
+        with patch("src.content_safety._client", FakeClient()):
+            first = await cs.analyze_safety("hello")
+            first["summary"] = "added by caller"
+            second = await cs.analyze_safety("hello")
+        assert "summary" not in second
+
+    async def test_concurrent_checks_share_one_request(self):
+        client = FakeClient()
+        with patch("src.content_safety._client", client):
+            results = await asyncio.gather(cs.analyze_safety("hello"), cs.analyze_safety("hello"))
+        assert results[0] == results[1]
+        assert results[0] is not results[1]
+        assert client.calls == 1
+
+    async def test_failures_not_cached(self):
+        client = FakeClient(fail=True)
+        with patch("src.content_safety._client", client):
+            await cs.analyze_safety("hello")
+            result = await cs.analyze_safety("hello")
+        assert result["safe"] is False
+        assert client.calls == 2
+
+
+class TestClientLifecycle:
+    """Test startup warm-up and shutdown of the shared client."""
+
+    async def test_prewarm_fetches_token(self):
+        scopes = []
+
+        async def get_token(scope):
+            scopes.append(scope)
+
+        credential = SimpleNamespace(get_token=get_token)
+        with patch("src.content_safety._client", FakeClient()), patch("src.content_safety._credential", credential):
+            await cs.prewarm()
+        assert scopes == [cs._CONTENT_SAFETY_SCOPE]
+
+    async def test_prewarm_failure_is_swallowed(self):
+        with patch("src.content_safety._get_client", side_effect=RuntimeError("no credential")):
+            await cs.prewarm()
+
+    async def test_aclose_drops_client_and_credential(self):
+        client, credential = FakeClient(), FakeClient()
+        with patch("src.content_safety._client", client), patch("src.content_safety._credential", credential):
+            await cs.aclose()
+            assert cs._client is None
+            assert cs._credential is None
+        assert client.closed
+        assert credential.closed
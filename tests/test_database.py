@@ -1,11 +1,16 @@
-"""Tests for src/database.py — in-memory CRUD operations."""
+"""Tests for src/database.py — CRUD operations and the Cosmos conversation cache."""
 
 import time
+from unittest.mock import patch
 
+import pytest
+
+import src.database as db
 from src.database import (
     delete_conversation,
     get_conversation,
     list_conversations,
+    list_conversations_page,
     save_conversation,
 )
 
@@ -53,6 +58,16 @@ class TestSaveAndGet:
         assert get_conversation("c1") is not None
         assert get_conversation("c2") is not None
 
+    def test_memory_store_evicts_least_recently_saved(self):
+        with patch("src.database._MEMORY_STORE_MAX_ENTRIES", 2):
+            save_conversation("c1", "One", [])
+            save_conversation("c2", "Two", [])
+            save_conversation("c1", "One again", [])
+            save_conversation("c3", "Three", [])
+        assert get_conversation("c2") is None
+        assert get_conversation("c1") is not None
+        assert get_conversation("c3") is not None
+
 
 class TestListConversations:
     """Test list operation."""
@@ -95,6 +110,38 @@ class TestListConversations:
         assert result_b[0]["id"] == "c2"
 
 
+class TestListConversationsPage:
+    """Test paginated listing."""
+
+    def test_pages_follow_continuation_token(self):
+        for i in range(5):
+            save_conversation(f"c{i}", f"Chat {i}", [])
+            time.sleep(0.001)
+        first, token = list_conversations_page(page_size=2)
+        second, token = list_conversations_page(page_size=2, continuation_token=token)
+        third, token = list_conversations_page(page_size=2, continuation_token=token)
+        assert [c["id"] for c in first + second + third] == ["c4", "c3", "c2", "c1", "c0"]
+        assert token is None
+
+    def test_invalid_token(self):
+        with pytest.raises(ValueError):
+            list_conversations_page(continuation_token="not-a-number")
+
+    def test_rejected_cosmos_token(self):
+        from azure.cosmos.exceptions import CosmosHttpResponseError
+
+        class RejectingContainer:
+            def query_items(self, **_kwargs):
+                return self
+
+            def by_page(self, _token):
+                raise CosmosHttpResponseError(status_code=400, message="bad continuation")
+
+        db._STATE["container"] = RejectingContainer()
+        with pytest.raises(ValueError):
+            list_conversations_page(continuation_token="garbage")
+
+
 class TestDeleteConversation:
     """Test delete operation."""
 
@@ -112,3 +159,94 @@ class TestDeleteConversation:
         delete_conversation("c2")
         assert get_conversation("c1") is not None
         assert get_conversation("c2") is None
+
+
+class FakeContainer:
+    """Cosmos container stub counting reads."""
+
+    def __init__(self):
+        self.items: dict[str, dict] = {}
+        self.reads = 0
+
+    def read_item(self, item, partition_key):
+        from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+        self.reads += 1
+        if item not in self.items:
+            raise CosmosResourceNotFoundError(message="not found")
+        return dict(self.items[item])
+
+    def patch_item(self, item, partition_key, patch_operations):
+        from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+        if item not in self.items:
+            raise CosmosResourceNotFoundError(message="not found")
+        for op in patch_operations:
+            self.items[item][op["path"].lstrip("/")] = op["value"]
+        return dict(self.items[item])
+
+    def create_item(self, doc):
+        self.items[doc["id"]] = dict(doc)
+        return dict(doc)
+
+    def delete_item(self, item, partition_key):
+        self.items.pop(item, None)
+
+
+class TestCosmosCache:
+    """Test the Cosmos conversation cache."""
+
+    @pytest.fixture
+    def container(self):
+        container = FakeContainer()
+        db._STATE["container"] = container
+        with patch("src.database.CONVERSATION_CACHE_TTL_S", 60):
+            yield container
+
+    def test_save_then_get_skips_reads(self, container):
+        save_conversation("c1", "Chat", [{"role": "user", "content": "hi"}])
+        save_conversation("c1", "Chat", [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "yo"}])
+        result = get_conversation("c1")
+        assert len(result["messages"]) == 2
+        assert container.reads == 0
+
+    def test_save_patches_and_keeps_created_at(self, container):
+        save_conversation("c1", "Chat", [])
+        created_at = container.items["c1"]["createdAt"]
+        save_conversation("c1", "Renamed", [{"role": "user", "content": "hi"}])
+        stored = container.items["c1"]
+        assert stored["createdAt"] == created_at
+        assert stored["title"] == "Renamed"
+        assert len(stored["messages"]) == 1
+
+    def test_create_race_falls_back_to_patch(self, container):
+        from azure.cosmos.exceptions import CosmosResourceExistsError
+
+        def create_lost_race(doc):
+            # Another replica created the conversation after our patch missed
+            container.items[doc["id"]] = {**doc, "createdAt": "earlier", "title": "Theirs"}
+            raise CosmosResourceExistsError(message="conflict")
+
+        container.create_item = create_lost_race
+        save_conversation("c1", "Ours", [{"role": "user", "content": "hi"}])
+        stored = container.items["c1"]
+        assert stored["title"] == "Ours"
+        assert stored["createdAt"] == "earlier"
+        assert "c1" not in db._memory_store
+
+    def test_returned_messages_are_a_copy(self, container):
+        save_conversation("c1", "Chat", [{"role": "user", "content": "hi"}])
+        get_conversation("c1")["messages"].append({"role": "user", "content": "unsaved"})
+        assert len(get_conversation("c1")["messages"]) == 1
+
+    def test_delete_invalidates(self, container):
+        save_conversation("c1", "Chat", [])
+        assert delete_conversation("c1")
+        assert get_conversation("c1") is None
+
+    def test_disabled_by_default(self, container):
+        with patch("src.database.CONVERSATION_CACHE_TTL_S", 0):
+            save_conversation("c1", "Chat", [])
+            get_conversation("c1")
+            get_conversation("c1")
+        assert container.reads == 2
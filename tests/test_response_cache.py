@@ -0,0 +1,122 @@
+"""Tests for src/response_cache.py — single-turn response cache."""
+
+from unittest.mock import patch
+
+import pytest
+
+import src.response_cache as rc
+from src.agent import IMAGE_DATA_END, IMAGE_DATA_START, run_agent_stream
+
+
+@pytest.fixture(autouse=True)
+def _enabled_cache():
+    """Enable a small cache and start every test empty."""
+    rc.clear()
+    with (
+        patch("src.response_cache.RESPONSE_CACHE_TTL_S", 60),
+        patch("src.response_cache.RESPONSE_CACHE_MAX_ENTRIES", 2),
+    ):
+        yield
+    rc.clear()
+
+
+def _key(message: str = "topic", platforms: list[str] | None = None) -> str:
+    return rc.make_key(
+        message, platforms or ["x", "linkedin"], "trend", "en", "medium", "auto", False, False, "parallel"
+    )
+
+
+class TestCacheOperations:
+    """Test get/put/eviction."""
+
+    def test_key_ignores_platform_order(self):
+        assert _key(platforms=["x", "linkedin"]) == _key(platforms=["linkedin", "x"])
+
+    def test_key_differs_by_message(self):
+        assert _key("a") != _key("b")
+
+    def test_put_and_get(self):
+        rc.put("k", ["a", "b"])
+        assert rc.get("k") == ["a", "b"]
+
+    def test_missing_key(self):
+        assert rc.get("nope") is None
+
+    def test_expired_entry(self):
+        with patch("src.response_cache.RESPONSE_CACHE_TTL_S", 0):
+            rc.put("k", ["a"])
+        assert rc.get("k") is None
+
+    def test_lru_eviction(self):
+        rc.put("k1", ["1"])
+        rc.put("k2", ["2"])
+        rc.get("k1")  # k2 is now least recently used
+        rc.put("k3", ["3"])
+        assert rc.get("k2") is None
+        assert rc.get("k1") == ["1"]
+        assert rc.get("k3") == ["3"]
+
+    def test_disabled_by_default_ttl(self):
+        with patch("src.response_cache.RESPONSE_CACHE_TTL_S", 0):
+            assert not rc.is_enabled()
+
+
+async def _collect(**kwargs) -> list[str]:
+    base = {"message": "topic", "platforms": ["x"], "content_type": "trend", "language": "en"}
+    return [chunk async for chunk in run_agent_stream(**{**base, **kwargs})]
+
+
+class TestRunAgentStreamCaching:
+    """Test the cache wrapper around run_agent_stream."""
+
+    async def test_second_request_replayed(self):
+        calls = []
+
+        async def fake_stream(**_kwargs):
+            calls.append(1)
+            yield "Hello "
+            yield "world"
+
+        with patch("src.agent._run_agent_stream", fake_stream):
+            first = await _collect()
+            second = await _collect()
+
+        assert first == second == ["Hello ", "world"]
+        assert len(calls) == 1
+
+    async def test_history_bypasses_cache(self):
+        calls = []
+
+        async def fake_stream(**_kwargs):
+            calls.append(1)
+            yield "text"
+
+        history = [{"role": "user", "content": "earlier"}]
+        with patch("src.agent._run_agent_stream", fake_stream):
+            await _collect(history=history)
+            await _collect(history=history)
+
+        assert len(calls) == 2
+
+    async def test_image_runs_not_cached(self):
+        calls = []
+
+        async def fake_stream(**_kwargs):
+            calls.append(1)
+            yield f'{IMAGE_DATA_START}{{"platform": "x"}}{IMAGE_DATA_END}'
+
+        with patch("src.agent._run_agent_stream", fake_stream):
+            await _collect()
+            await _collect()
+
+        assert len(calls) == 2
+
+    async def test_failed_stream_not_cached(self):
+        async def failing_stream(**_kwargs):
+            yield "partial"
+            raise RuntimeError("boom")
+
+        with patch("src.agent._run_agent_stream", failing_stream), pytest.raises(RuntimeError):
+            await _collect()
+
+        assert rc.get(_key(platforms=["x"])) is None